@@ -0,0 +1,82 @@
+"""Admission control for heavy requests.
+
+CSV imports parse with pandas and hold the SQLite write lock for the whole
+batch. Letting every upload run at once starves interactive reads of threads
+and of the database. ``import_limiter`` admits at most
+``MAX_CONCURRENT_IMPORTS`` imports per worker and queues up to
+``IMPORT_QUEUE_LIMIT`` more. Anything beyond that, or anything that waits
+longer than ``IMPORT_QUEUE_TIMEOUT_SECONDS``, is rejected so the client can
+retry later.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from app.core.config import settings
+
+
+class AdmissionRejected(Exception):
+    """The request could not be admitted; retry after ``retry_after`` seconds."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """Async semaphore with a bounded, time-limited wait queue.
+
+    asyncio primitives belong to the event loop that first waits on them, so
+    the semaphore is created for the running loop on first use and replaced
+    if the limiter is later used from another loop (each TestClient or
+    ``asyncio.run`` starts a new one).
+    """
+
+    def __init__(self, max_concurrent: int, max_queued: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.active = 0
+        self.queued = 0
+
+    def _bind_to_running_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+            self.active = 0
+            self.queued = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        self._bind_to_running_loop()
+        retry_after = max(1, int(self.queue_timeout))
+        if not self._semaphore.locked():
+            # Free slot: acquire() returns without suspending
+            await self._semaphore.acquire()
+        elif self.queued >= self.max_queued:
+            raise AdmissionRejected("Too many imports in progress, please retry later.", retry_after)
+        else:
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise AdmissionRejected("Timed out waiting for an import slot, please retry later.", retry_after)
+            finally:
+                self.queued -= 1
+
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+
+import_limiter = ConcurrencyLimiter(
+    settings.MAX_CONCURRENT_IMPORTS,
+    settings.IMPORT_QUEUE_LIMIT,
+    settings.IMPORT_QUEUE_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,259 @@
+"""In-memory columnar spending cube for arbitrary date-range summaries.
+
+Each user's transactions are held as three parallel NumPy arrays sorted by
+date: ``days`` (int32 days since 1970-01-01), ``amounts`` (float64) and
+``categories`` (uint8 codes into ``CATEGORIES``). Range queries slice the
+arrays with ``searchsorted`` and aggregate per (bucket, category) with a single
+weighted ``bincount``.
+
+Cubes are loaded lazily on first use, replaced by an extended copy after CSV
+imports and evicted least-recently-used once ``ANALYTICS_CACHE_MAX_BYTES`` is
+exceeded. A cube is tagged with the ``User.data_version`` its rows were read
+at, so any other write simply causes a reload on the next read. Cached cubes
+are never modified, so a request thread summarizing one always sees
+consistent arrays.
+"""
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import archive, models
+from app.core.config import settings
+
+CATEGORIES = list(models.TransactionCategoryEnum)
+CATEGORY_CODES = {category: code for code, category in enumerate(CATEGORIES)}
+_CATEGORY_CODES_BY_VALUE = {category.value: code for code, category in enumerate(CATEGORIES)}
+BUCKETS = ("day", "week", "month", "quarter", "year")
+MAX_BUCKETS = 3660
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def to_day(value: date) -> int:
+    """Days since 1970-01-01 for a date or datetime."""
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.toordinal() - _EPOCH_ORDINAL
+
+
+def _bucket_keys(days: np.ndarray, bucket: str) -> np.ndarray:
+    """Map day numbers to monotonically increasing integer bucket keys."""
+    days = days.astype(np.int64)
+    if bucket == "day":
+        return days
+    if bucket == "week":
+        # 1970-01-01 was a Thursday; shift so ISO weeks start on Monday.
+        return (days + 3) // 7
+    months = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    if bucket == "month":
+        return months
+    if bucket == "quarter":
+        return months // 3
+    if bucket == "year":
+        return months // 12
+    raise ValueError(f"Unknown bucket '{bucket}'. Expected one of: {', '.join(BUCKETS)}")
+
+
+def _bucket_start(key: int, bucket: str) -> date:
+    if bucket == "day":
+        day = key
+    elif bucket == "week":
+        day = key * 7 - 3
+    else:
+        months = {"month": 1, "quarter": 3, "year": 12}[bucket] * key
+        day = np.datetime64(months, "M").astype("datetime64[D]").astype(np.int64)
+    return date.fromordinal(int(day) + _EPOCH_ORDINAL)
+
+
+class UserCube:
+    """Columnar snapshot of one user's transactions, sorted by day.
+
+    ``max_id`` is the highest hot-table id among the rows, which tells
+    whether the cube already holds a given import.
+    """
+
+    def __init__(self, days: np.ndarray, amounts: np.ndarray, categories: np.ndarray, version: int = 0, max_id: int = 0):
+        self.days = np.asarray(days, dtype=np.int32)
+        self.amounts = np.asarray(amounts, dtype=np.float64)
+        self.categories = np.asarray(categories, dtype=np.uint8)
+        self.version = version
+        self.max_id = max_id
+        self._sort()
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[datetime, float, models.TransactionCategoryEnum]], version: int = 0, max_id: int = 0) -> "UserCube":
+        rows = list(rows)
+        n = len(rows)
+        days = np.fromiter((to_day(d) for d, _, _ in rows), dtype=np.int32, count=n)
+        amounts = np.fromiter((a for _, a, _ in rows), dtype=np.float64, count=n)
+        categories = np.fromiter((CATEGORY_CODES[models.TransactionCategoryEnum(c)] for _, _, c in rows), dtype=np.uint8, count=n)
+        return cls(days, amounts, categories, version, max_id)
+
+    @property
+    def nbytes(self) -> int:
+        return self.days.nbytes + self.amounts.nbytes + self.categories.nbytes
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def _sort(self):
+        if len(self.days) > 1 and np.any(self.days[1:] < self.days[:-1]):
+            order = np.argsort(self.days, kind="stable")
+            self.days = self.days[order]
+            self.amounts = self.amounts[order]
+            self.categories = self.categories[order]
+
+    def merged(self, other: "UserCube", version: int) -> "UserCube":
+        """A new cube holding this cube's rows plus ``other``'s."""
+        return UserCube(
+            np.concatenate([self.days, other.days]),
+            np.concatenate([self.amounts, other.amounts]),
+            np.concatenate([self.categories, other.categories]),
+            version,
+            max(self.max_id, other.max_id),
+        )
+
+    def summarize(self, start: date, end: date, bucket: str) -> List[Tuple[date, np.ndarray]]:
+        """Spending per category for every bucket overlapping [start, end].
+
+        Returns ``(bucket_start, totals)`` pairs where ``totals[code]`` is the
+        summed (negative) spend of ``CATEGORIES[code]``. Empty buckets are
+        included so trends can be charted without gaps.
+        """
+        start_day, end_day = to_day(start), to_day(end)
+        first_key, last_key = _bucket_keys(np.array([start_day, end_day]), bucket)
+        n_buckets = int(last_key - first_key) + 1
+        if n_buckets > MAX_BUCKETS:
+            raise ValueError(f"Range produces {n_buckets} {bucket} buckets; the maximum is {MAX_BUCKETS}.")
+
+        lo = np.searchsorted(self.days, start_day, side="left")
+        hi = np.searchsorted(self.days, end_day, side="right")
+        amounts = self.amounts[lo:hi]
+        spending = amounts < 0
+        keys = _bucket_keys(self.days[lo:hi][spending], bucket) - first_key
+        n_categories = len(CATEGORIES)
+        totals = np.bincount(
+            keys * n_categories + self.categories[lo:hi][spending],
+            weights=amounts[spending],
+            minlength=n_buckets * n_categories,
+        ).reshape(n_buckets, n_categories)
+        return [(_bucket_start(int(first_key) + i, bucket), totals[i]) for i in range(n_buckets)]
+
+
+def load_cube(db: Session, user_id: Optional[int], version: int = 0) -> UserCube:
+    """Build a cube from the hot table plus any archived Parquet partitions."""
+    query = select(models.Transaction.id, models.Transaction.date, models.Transaction.amount, models.Transaction.category)
+    if user_id:
+        query = query.where(models.Transaction.owner_id == user_id)
+    rows = db.execute(query.order_by(models.Transaction.date)).all()
+    cube = UserCube.from_rows((row[1:] for row in rows), version, max((row[0] for row in rows), default=0))
+
+    archived = archive.read_archived(user_id, columns=["date", "amount", "category"])
+    if archived is not None and archived.num_rows:
+        days = archived["date"].to_numpy().astype("datetime64[D]").astype(np.int32)
+        categories = np.fromiter(
+            (_CATEGORY_CODES_BY_VALUE[c] for c in archived["category"].to_pylist()), dtype=np.uint8, count=archived.num_rows
+        )
+        cube = cube.merged(UserCube(days, archived["amount"].to_numpy(), categories), version)
+    return cube
+
+
+def data_version(db: Session, user_id: Optional[int]) -> int:
+    if not user_id:
+        return 0
+    return db.query(models.User.data_version).filter(models.User.id == user_id).scalar() or 0
+
+
+class CubeCache:
+    """LRU of per-user cubes bounded by total array memory."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._cubes: "OrderedDict[int, UserCube]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(cube.nbytes for cube in self._cubes.values())
+
+    def get(self, db: Session, user_id: Optional[int], version: int = 0) -> UserCube:
+        """A cube reflecting at least ``version`` of the user's data."""
+        if not user_id:
+            return load_cube(db, user_id, version)
+        with self._lock:
+            cube = self._cubes.get(user_id)
+            if cube is not None and cube.version >= version:
+                self._cubes.move_to_end(user_id)
+                return cube
+        # The caller's version was read at authentication and may be stale.
+        # Tag the cube with the version current while reading its rows, and
+        # only cache it if no write committed meanwhile.
+        version = data_version(db, user_id)
+        cube = load_cube(db, user_id, version)
+        if data_version(db, user_id) == version:
+            self._store(user_id, cube)
+        return cube
+
+    def extend(
+        self,
+        user_id: Optional[int],
+        rows: Iterable[Tuple[datetime, float, models.TransactionCategoryEnum]],
+        version: int,
+        ids: Sequence[int] = (),
+    ):
+        """Add an import's rows to a cached cube that predates it.
+
+        ``version`` is the data version the import committed as and ``ids``
+        the ids of its rows. A cube that already holds those rows (it was
+        loaded after the import committed) is kept if it is tagged at least
+        ``version`` and dropped otherwise. A cube that missed an intermediate
+        write is dropped and reloaded lazily instead.
+        """
+        if not user_id:
+            return
+        imported = UserCube.from_rows(rows, max_id=max(ids, default=0))
+        with self._lock:
+            cube = self._cubes.get(user_id)
+            if cube is None:
+                return
+            if ids and cube.max_id >= min(ids):
+                if cube.version < version:
+                    del self._cubes[user_id]
+                return
+            # Tagged ``version`` but without the rows: loaded between the
+            # version bump and the rows becoming visible (sharded commits).
+            if cube.version not in (version - 1, version):
+                del self._cubes[user_id]
+                return
+            # Swap in a new cube rather than growing the cached one, which
+            # readers may be summarizing right now
+            self._cubes[user_id] = cube.merged(imported, version)
+            self._cubes.move_to_end(user_id)
+            self._evict()
+
+    def invalidate(self, user_id: Optional[int] = None):
+        with self._lock:
+            if user_id is None:
+                self._cubes.clear()
+            else:
+                self._cubes.pop(user_id, None)
+
+    def _store(self, user_id: int, cube: UserCube):
+        with self._lock:
+            self._cubes[user_id] = cube
+            self._cubes.move_to_end(user_id)
+            self._evict()
+
+    def _evict(self):
+        total = self.nbytes
+        while total > self.max_bytes and len(self._cubes) > 1:
+            _, evicted = self._cubes.popitem(last=False)
+            total -= evicted.nbytes
+
+
+cube_cache = CubeCache(settings.ANALYTICS_CACHE_MAX_BYTES)
@@ -0,0 +1,284 @@
+"""Cold storage for old transactions as per-user, per-month Parquet files.
+
+Transactions older than ``ARCHIVE_HORIZON_DAYS`` are moved out of the hot
+``transactions`` table into::
+
+    ARCHIVE_DIR/user=<owner_id>/month=<YYYY-MM>/part-<uuid>.parquet
+
+Each archive run adds new part files, so existing files are never rewritten.
+Summaries, the analytics cube and search read the archive transparently,
+opening only the month partitions that overlap the requested range. Archived
+rows are read-only and keep their ids, which the hot table never reuses.
+
+Parts are written as ``*.parquet.pending`` and renamed only after the delete
+from the hot table has committed, so readers never count a row twice. If a
+run dies in between, the next run for that user finishes or discards the
+pending files (see ``recover_pending``).
+
+pyarrow is imported lazily, so deployments that never archive do not need it
+at runtime. Run an archive pass with ``python -m app.archive``.
+"""
+import argparse
+import os
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import models, sharding
+from app.core.config import settings
+from app.database import bind_owner
+
+PENDING_SUFFIX = ".pending"
+COLUMNS = ("id", "date", "description", "amount", "raw_text", "category", "notes", "created_at", "updated_at", "owner_id")
+
+
+def _arrow_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("id", pa.int64()),
+        ("date", pa.timestamp("us")),
+        ("description", pa.string()),
+        ("amount", pa.float64()),
+        ("raw_text", pa.string()),
+        ("category", pa.string()),
+        ("notes", pa.string()),
+        ("created_at", pa.timestamp("us")),
+        ("updated_at", pa.timestamp("us")),
+        ("owner_id", pa.int64()),
+    ])
+
+
+def archive_root() -> Path:
+    return Path(settings.ARCHIVE_DIR)
+
+
+def _user_dir(user_id: Optional[int]) -> Path:
+    return archive_root() / f"user={user_id if user_id else 'none'}"
+
+
+def _month_key(value: date) -> str:
+    return f"{value.year:04d}-{value.month:02d}"
+
+
+def partition_files(user_id: Optional[int], start: Optional[date] = None, end: Optional[date] = None) -> List[Path]:
+    """Parquet files for a user whose month partition overlaps [start, end].
+
+    ``user_id=None`` means every user's partitions.
+    """
+    user_dirs = [_user_dir(user_id)] if user_id else sorted(archive_root().glob("user=*"))
+    first = _month_key(start) if start else None
+    last = _month_key(end) if end else None
+    files = []
+    for user_dir in user_dirs:
+        if not user_dir.is_dir():
+            continue
+        for month_dir in sorted(user_dir.glob("month=*")):
+            month = month_dir.name[len("month="):]
+            if (first and month < first) or (last and month > last):
+                continue
+            files.extend(sorted(month_dir.glob("*.parquet")))
+    return files
+
+
+def read_archived(
+    user_id: Optional[int],
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    columns: Optional[Sequence[str]] = None,
+):
+    """Archived rows in [start, end] as a pyarrow Table, or None if there are none."""
+    files = partition_files(user_id, start, end)
+    if not files:
+        return None
+
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    read_columns = list(columns) if columns else list(COLUMNS)
+    if (start or end) and "date" not in read_columns:
+        read_columns.append("date")
+    table = pa.concat_tables([pq.read_table(path, columns=read_columns) for path in files])
+    if start:
+        table = table.filter(pc.greater_equal(table["date"], pa.scalar(datetime.combine(start, datetime.min.time()), pa.timestamp("us"))))
+    if end:
+        table = table.filter(pc.less(table["date"], pa.scalar(datetime.combine(end + timedelta(days=1), datetime.min.time()), pa.timestamp("us"))))
+    return table.select(list(columns)) if columns else table
+
+
+def max_archived_id(user_id: Optional[int] = None) -> int:
+    """Highest transaction id in a user's archive (everyone's if None), or 0 if empty."""
+    table = read_archived(user_id, columns=["id"])
+    if table is None or table.num_rows == 0:
+        return 0
+
+    import pyarrow.compute as pc
+
+    return pc.max(table["id"]).as_py()
+
+
+def spending_by_category(user_id: Optional[int], start: date, end: date) -> Dict[models.TransactionCategoryEnum, float]:
+    """Summed negative amounts per category for archived rows in [start, end]."""
+    table = read_archived(user_id, start, end, columns=["amount", "category"])
+    if table is None or table.num_rows == 0:
+        return {}
+
+    import pyarrow.compute as pc
+
+    spending = table.filter(pc.less(table["amount"], 0))
+    grouped = spending.group_by("category").aggregate([("amount", "sum")])
+    return {
+        models.TransactionCategoryEnum(category): total
+        for category, total in zip(grouped["category"].to_pylist(), grouped["amount_sum"].to_pylist())
+    }
+
+
+def _to_table(transactions: List[models.Transaction]):
+    import pyarrow as pa
+
+    data = {name: [] for name in COLUMNS}
+    for transaction in transactions:
+        for name in COLUMNS:
+            value = getattr(transaction, name)
+            if name == "category":
+                value = models.TransactionCategoryEnum(value).value
+            data[name].append(value)
+    return pa.Table.from_pydict(data, schema=_arrow_schema())
+
+
+def recover_pending(db, user_id: Optional[int] = None) -> int:
+    """Resolve part files left pending by an interrupted archive run.
+
+    A pending file whose rows are still in the hot table belongs to a run
+    that never committed its delete, so it is discarded. Otherwise the delete
+    committed and the file is published. ``db`` is a Session or Connection
+    on the user's shard. Returns the number published.
+    """
+    paths = sorted(_user_dir(user_id).glob(f"month=*/*.parquet{PENDING_SUFFIX}"))
+    if not paths:
+        return 0
+
+    import pyarrow.parquet as pq
+
+    owner = models.Transaction.owner_id == user_id if user_id else models.Transaction.owner_id.is_(None)
+    published = 0
+    for path in paths:
+        # The delete commits all of a run's rows at once, so one id tells.
+        # Check the owner too: shard migrations give rows new ids.
+        first_id = pq.read_table(path, columns=["id"])["id"][0].as_py()
+        if db.execute(select(models.Transaction.id).where(models.Transaction.id == first_id, owner)).first():
+            path.unlink()
+        else:
+            path.rename(path.with_suffix(""))
+            published += 1
+    return published
+
+
+def archive_transactions(db: Session, before: datetime, user_id: Optional[int] = None) -> int:
+    """Move one user's transactions dated before ``before`` into Parquet.
+
+    Files are written as pending before the rows are deleted and published
+    once the delete has committed. If the delete fails they are removed again.
+    """
+    import pyarrow.parquet as pq
+    from app.crud import bump_data_version
+
+    recover_pending(db, user_id)
+    query = db.query(models.Transaction).filter(models.Transaction.date < before)
+    if user_id:
+        query = query.filter(models.Transaction.owner_id == user_id)
+    else:
+        query = query.filter(models.Transaction.owner_id.is_(None))
+    transactions = query.order_by(models.Transaction.date, models.Transaction.id).all()
+    if not transactions:
+        return 0
+
+    by_month: Dict[str, List[models.Transaction]] = {}
+    for transaction in transactions:
+        by_month.setdefault(_month_key(transaction.date), []).append(transaction)
+
+    written = []
+    try:
+        for month, rows in by_month.items():
+            month_dir = _user_dir(user_id) / f"month={month}"
+            month_dir.mkdir(parents=True, exist_ok=True)
+            path = month_dir / f"part-{uuid.uuid4().hex}.parquet{PENDING_SUFFIX}"
+            pq.write_table(_to_table(rows), path, compression=settings.ARCHIVE_COMPRESSION)
+            written.append(path)
+
+        ids = [transaction.id for transaction in transactions]
+        for offset in range(0, len(ids), 500):
+            db.query(models.Transaction).filter(
+                models.Transaction.id.in_(ids[offset:offset + 500])
+            ).delete(synchronize_session=False)
+        bump_data_version(db, user_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        for path in written:
+            path.unlink(missing_ok=True)
+        raise
+    for path in written:
+        try:
+            path.rename(path.with_suffix(""))
+        except FileNotFoundError:
+            pass  # already published by a concurrent recover_pending
+    return len(transactions)
+
+
+def _owners_with_pending() -> List[Optional[int]]:
+    owners = []
+    for user_dir in sorted(archive_root().glob("user=*")):
+        if any(user_dir.glob(f"month=*/*.parquet{PENDING_SUFFIX}")):
+            name = user_dir.name[len("user="):]
+            owners.append(None if name == "none" else int(name))
+    return owners
+
+
+def archive_all(db: Session, horizon_days: Optional[int] = None) -> Dict[Optional[int], int]:
+    """Archive every user's transactions older than the horizon."""
+    horizon_days = settings.ARCHIVE_HORIZON_DAYS if horizon_days is None else horizon_days
+    before = datetime.combine(date.today() - timedelta(days=horizon_days), datetime.min.time())
+    if sharding.enabled():
+        # Visit users one shard lookup at a time. Only users in user_shards
+        # can have rows; looking up anyone else would assign them a shard.
+        owners = [user_id for (user_id,) in db.query(models.UserShard.user_id).order_by(models.UserShard.user_id)]
+    else:
+        owners = [
+            owner_id for (owner_id,) in
+            db.query(models.Transaction.owner_id).filter(models.Transaction.date < before).group_by(models.Transaction.owner_id)
+        ]
+    # Finish interrupted runs even for owners with nothing left to archive
+    owners += [owner_id for owner_id in _owners_with_pending() if owner_id not in owners]
+    moved = {}
+    for owner_id in owners:
+        bind_owner(db, owner_id)
+        count = archive_transactions(db, before, owner_id)
+        if count:
+            moved[owner_id] = count
+    return moved
+
+
+def main():
+    from app.database import SessionLocal, init_db
+
+    parser = argparse.ArgumentParser(description="Move old transactions into the Parquet archive.")
+    parser.add_argument("--horizon-days", type=int, default=None,
+                        help=f"archive transactions older than this many days (default: ARCHIVE_HORIZON_DAYS={settings.ARCHIVE_HORIZON_DAYS})")
+    args = parser.parse_args()
+
+    init_db()
+    with SessionLocal() as db:
+        moved = archive_all(db, args.horizon_days)
+    for owner_id, count in moved.items():
+        print(f"user {owner_id}: archived {count} transactions")
+    print(f"archived {sum(moved.values())} transactions into {os.path.abspath(settings.ARCHIVE_DIR)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Conditional GET support for the read endpoints.
+
+Every transaction or rule write bumps ``User.data_version`` (see
+``crud.bump_data_version``). Read endpoints derive a strong ETag from
+(user, endpoint, params, version), answer ``If-None-Match`` with 304 and keep
+rendered bodies in a bounded LRU cache so repeated dashboard refreshes never
+re-run the underlying queries.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app import models
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+
+class ResponseCache:
+    """Thread-safe LRU mapping of cache keys to rendered response bodies.
+
+    Bounded by the total size of the cached bodies. Keys are
+    ``make_cache_key`` tuples; once a user's data version moves on, bodies
+    rendered for older versions can never be served again and are dropped.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._versions: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        with self._lock:
+            self._drop_older_versions(key)
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def set(self, key: tuple, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            self._drop_older_versions(key)
+            if key[-1] < self._versions[key[0]]:
+                return  # rendered for a request that started before a write
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= len(previous)
+            self._entries[key] = body
+            self.nbytes += len(body)
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self.nbytes = 0
+
+    def _drop_older_versions(self, key: tuple):
+        user_id, version = key[0], key[-1]
+        seen = self._versions.get(user_id)
+        if seen is not None and version <= seen:
+            return
+        self._versions[user_id] = version
+        if seen is not None:
+            for stale in [k for k in self._entries if k[0] == user_id]:
+                self.nbytes -= len(self._entries.pop(stale))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_MAX_BYTES)
+
+
+def make_cache_key(user_id: int, endpoint: str, params: Dict[str, Any], version: int) -> tuple:
+    return (user_id, endpoint, tuple(sorted(params.items())), version)
+
+
+def make_etag(key: tuple) -> str:
+    return '"%s"' % hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison as required for If-None-Match (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def render_json(data: Any) -> bytes:
+    """Render data exactly as FastAPI's default JSONResponse would."""
+    return JSONResponse(content=jsonable_encoder(data)).body
+
+
+def dump_json(data: Any) -> bytes:
+    """Serialize plain JSON types (dicts, lists, str, int, float, None) quickly."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def cached_json_response(
+    request: Request,
+    user: Optional[models.User],
+    endpoint: str,
+    params: Dict[str, Any],
+    build: Callable[[], bytes],
+) -> Response:
+    """Serve ``build()`` with an ETag, a 304 shortcut and server-side caching."""
+    if user is None:
+        return Response(content=build(), media_type="application/json")
+
+    key = make_cache_key(user.id, endpoint, params, user.data_version or 0)
+    etag = make_etag(key)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    body = response_cache.get(key)
+    if body is None:
+        body = build()
+        response_cache.set(key, body)
+    return Response(content=body, media_type="application/json", headers=headers)
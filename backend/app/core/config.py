@@ -14,6 +14,28 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Conditional GET / response caching
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # Columnar analytics cube
+    ANALYTICS_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+
+    # Parquet cold storage
+    ARCHIVE_DIR: str = "./archive"
+    ARCHIVE_HORIZON_DAYS: int = 730
+    ARCHIVE_COMPRESSION: str = "zstd"
+
+    # Per-tenant sharding: "none", "per_user" (one SQLite file per user) or
+    # "hashed" (SHARD_COUNT files). Users and the shard map stay in DATABASE_URL.
+    SHARD_MODE: str = "none"
+    SHARD_COUNT: int = 4
+    SHARD_DIR: str = "./shards"
+
+    # Admission control for CSV imports (per worker process)
+    MAX_CONCURRENT_IMPORTS: int = 2
+    IMPORT_QUEUE_LIMIT: int = 16
+    IMPORT_QUEUE_TIMEOUT_SECONDS: float = 30.0
+
     class Config:
         env_file = ".env"
         extra = "ignore"
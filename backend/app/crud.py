@@ -1,11 +1,15 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
-from . import models, schemas
-from typing import List, Optional, Dict
-from datetime import datetime
-import pandas as pd
+from sqlalchemy import func, extract, select, cast, type_coerce, Integer, String
+from . import models, schemas, search, archive
+from typing import List, Optional, Dict, TYPE_CHECKING
+from datetime import date, datetime, timedelta
 from passlib.context import CryptContext
 
+# pandas and numpy (via app.analytics) are imported inside the functions that
+# need them so workers that only serve auth and list requests start quickly.
+if TYPE_CHECKING:
+    import pandas as pd
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def verify_password(plain_password, hashed_password):
@@ -25,6 +29,16 @@ def create_user(db: Session, user: schemas.UserCreate):
     db.refresh(db_user)
     return db_user
 
+def bump_data_version(db: Session, user_id: Optional[int]):
+    """Invalidate cached reads for a user. Call before committing a write."""
+    if user_id:
+        # Flush pending rows first so that, when sharded, the shared users
+        # table is only write-locked for this single UPDATE and the commit.
+        db.flush()
+        db.query(models.User).filter(models.User.id == user_id).update(
+            {models.User.data_version: models.User.data_version + 1}
+        )
+
 # Rule management functions
 def get_rules(db: Session, user_id: Optional[int] = None, skip: int = 0, limit: int = 100):
     query = db.query(models.Rule)
@@ -41,10 +55,39 @@ def create_rule(db: Session, rule: schemas.RuleCreate, user_id: Optional[int] =
         owner_id=user_id
     )
     db.add(db_rule)
+    bump_data_version(db, user_id)
     db.commit()
     db.refresh(db_rule)
+    apply_rule_to_existing(db, db_rule, user_id)
     return db_rule
 
+def apply_rule_to_existing(db: Session, rule: models.Rule, user_id: Optional[int] = None) -> int:
+    """Categorize already imported, still uncategorized transactions matched by a rule.
+
+    The full-text index narrows the candidates when the pattern is a plain
+    literal; every candidate is still confirmed with the rule's regex.
+    """
+    if not rule.is_active:
+        return 0
+    query = db.query(models.Transaction).filter(
+        models.Transaction.category == models.TransactionCategoryEnum.UNCATEGORIZED
+    )
+    if user_id:
+        query = query.filter(models.Transaction.owner_id == user_id)
+    match = search.rule_match_query(rule.pattern)
+    if match is not None:
+        query = search.filter_by_match(query, match)
+
+    updated = 0
+    for db_transaction in query:
+        if rule.matches(db_transaction.description or "") or (db_transaction.raw_text and rule.matches(db_transaction.raw_text)):
+            db_transaction.category = rule.category
+            updated += 1
+    if updated:
+        bump_data_version(db, user_id)
+        db.commit()
+    return updated
+
 def update_rule(db: Session, rule_id: int, rule_update: schemas.RuleUpdate, user_id: Optional[int] = None):
     db_rule = db.query(models.Rule).filter(models.Rule.id == rule_id)
     if user_id:
@@ -57,6 +100,7 @@ def update_rule(db: Session, rule_id: int, rule_update: schemas.RuleUpdate, user
     for key, value in rule_update.dict(exclude_unset=True).items():
         setattr(db_rule, key, value)
     
+    bump_data_version(db, user_id)
     db.commit()
     db.refresh(db_rule)
     return db_rule
@@ -71,6 +115,7 @@ def delete_rule(db: Session, rule_id: int, user_id: Optional[int] = None):
         return False
     
     db.delete(db_rule)
+    bump_data_version(db, user_id)
     db.commit()
     return True
 
@@ -100,19 +145,7 @@ def create_transaction(db: Session, transaction: schemas.TransactionCreate, user
         db_transaction.categorize(rules)
     
     db.add(db_transaction)
-    db.commit()
-    db.refresh(db_transaction)
-    return db_transaction
-
-def create_transaction(db: Session, transaction: schemas.TransactionCreate, user_id: Optional[int] = None):
-    if transaction.category == models.TransactionCategoryEnum.UNCATEGORIZED:
-        transaction.category = auto_categorize_transaction(transaction.description, transaction.raw_text, transaction.amount)
-
-    db_transaction = models.Transaction(
-        **transaction.model_dump(),
-        owner_id=user_id
-    )
-    db.add(db_transaction)
+    bump_data_version(db, user_id)
     db.commit()
     db.refresh(db_transaction)
     return db_transaction
@@ -123,6 +156,38 @@ def get_transactions(db: Session, user_id: Optional[int] = None, skip: int = 0,
         query = query.filter(models.Transaction.owner_id == user_id)
     return query.order_by(models.Transaction.date.desc()).offset(skip).limit(limit).all()
 
+_CATEGORY_CODES_BY_NAME = {category.name: code for code, category in enumerate(models.TransactionCategoryEnum)}
+
+def get_transaction_columns(db: Session, user_id: Optional[int] = None, skip: int = 0, limit: int = 100) -> Dict[str, list]:
+    """Same rows as get_transactions, as parallel column lists.
+
+    Reads plain Core row tuples: dates come back from SQLite as epoch seconds
+    and categories as their stored names, so no ORM objects, datetimes or enum
+    members are built. Categories are returned as codes into
+    list(TransactionCategoryEnum).
+    """
+    t = models.Transaction
+    query = select(
+        t.id,
+        cast(func.strftime('%s', t.date), Integer),
+        t.description,
+        t.amount,
+        t.raw_text,
+        type_coerce(t.category, String),
+    )
+    if user_id:
+        query = query.where(t.owner_id == user_id)
+    rows = db.execute(query.order_by(t.date.desc()).offset(skip).limit(limit)).all()
+    ids, dates, descriptions, amounts, raw_texts, categories = (list(column) for column in (list(zip(*rows)) or [()] * 6))
+    return {
+        "id": ids,
+        "date": dates,
+        "description": descriptions,
+        "amount": amounts,
+        "raw_text": raw_texts,
+        "category": [_CATEGORY_CODES_BY_NAME[name] for name in categories],
+    }
+
 def get_transaction(db: Session, transaction_id: int, user_id: Optional[int] = None):
     query = db.query(models.Transaction).filter(models.Transaction.id == transaction_id)
     if user_id:
@@ -133,26 +198,41 @@ def update_transaction_category(db: Session, transaction_id: int, category_updat
     db_transaction = get_transaction(db, transaction_id, user_id)
     if db_transaction:
         db_transaction.category = category_update.category
+        bump_data_version(db, user_id)
         db.commit()
         db.refresh(db_transaction)
     return db_transaction
 
-def bulk_create_transactions_from_df(db: Session, df: pd.DataFrame, user_id: Optional[int] = None):
+def bulk_create_transactions_from_df(db: Session, df: "pd.DataFrame", user_id: Optional[int] = None):
+    import pandas as pd
+    from . import analytics
+
     transactions_to_create = []
+    cube_rows = []
+    rules = get_active_rules(db, user_id)
     for _, row in df.iterrows():
-        category = auto_categorize_transaction(row['Description'], row.get('RawText'), row['Amount'])
+        raw_text = row.get('RawText')
         transaction_data = schemas.TransactionCreate(
             date=pd.to_datetime(row['Date']),
             description=row['Description'],
             amount=row['Amount'],
-            raw_text=row.get('RawText'),
-            category=category
+            raw_text=None if pd.isna(raw_text) else raw_text
         )
         db_transaction = models.Transaction(**transaction_data.model_dump(), owner_id=user_id)
+        db_transaction.categorize(rules)
         transactions_to_create.append(db_transaction)
+        cube_rows.append((db_transaction.date, db_transaction.amount, db_transaction.category))
 
     db.add_all(transactions_to_create)
+    bump_data_version(db, user_id)
+    if user_id:
+        # Read before committing, while this transaction still holds the
+        # write lock, so these are exactly the version and ids it commits
+        version = analytics.data_version(db, user_id)
+        ids = [transaction.id for transaction in transactions_to_create]
     db.commit()
+    if user_id:
+        analytics.cube_cache.extend(user_id, cube_rows, version, ids)
     return {"message": f"{len(transactions_to_create)} transactions created successfully."}
 
 def get_monthly_spending_summary(db: Session, year: int, month: int, user_id: Optional[int] = None) -> List[schemas.MonthlySummaryItem]:
@@ -167,5 +247,23 @@ def get_monthly_spending_summary(db: Session, year: int, month: int, user_id: Op
     if user_id:
         query = query.filter(models.Transaction.owner_id == user_id)
 
-    summary_data = query.group_by(models.Transaction.category).all()
-    return [schemas.MonthlySummaryItem(category=cat, total_amount=total) for cat, total in summary_data]
+    totals = dict(query.group_by(models.Transaction.category).all())
+    first_day = date(year, month, 1)
+    last_day = (first_day + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    for cat, total in archive.spending_by_category(user_id, first_day, last_day).items():
+        totals[cat] = totals.get(cat, 0.0) + total
+    return [schemas.MonthlySummaryItem(category=cat, total_amount=total) for cat, total in totals.items()]
+
+def get_range_spending_summary(db: Session, start: date, end: date, bucket: schemas.SummaryBucketEnum, user_id: Optional[int] = None, version: int = 0) -> List[schemas.RangeSummaryBucket]:
+    """Bucketed spending summary served from the in-memory analytics cube."""
+    from . import analytics
+
+    cube = analytics.cube_cache.get(db, user_id, version)
+    buckets = []
+    for period_start, totals in cube.summarize(start, end, bucket.value):
+        items = [
+            schemas.MonthlySummaryItem(category=analytics.CATEGORIES[code], total_amount=float(total))
+            for code, total in enumerate(totals) if total
+        ]
+        buckets.append(schemas.RangeSummaryBucket(period_start=period_start, total_amount=float(totals.sum()), summary=items))
+    return buckets
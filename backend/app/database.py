@@ -1,6 +1,7 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.util import find_tables
 from app.core.config import settings
 import os
 
@@ -9,12 +10,156 @@ engine = create_engine(
     settings.SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False}
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+class RoutingSession(Session):
+    """Session that sends sharded tables to the owner's shard (see app.sharding).
+
+    With sharding disabled this behaves exactly like a plain Session.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        from app import sharding
+
+        if sharding.enabled() and self._touches_sharded_table(mapper, clause):
+            owner_id = self.info.get("owner_id")
+            if owner_id is None:
+                raise RuntimeError("Session is not bound to an owner; call bind_owner() before querying sharded tables")
+            if "shard" not in self.info:
+                self.info["shard"] = sharding.shard_for_user(owner_id)
+            return sharding.engine_for_shard(self.info["shard"])
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+    @staticmethod
+    def _touches_sharded_table(mapper, clause) -> bool:
+        from app.sharding import SHARDED_TABLES
+
+        if mapper is not None:
+            return mapper.local_table.name in SHARDED_TABLES
+        if clause is not None:
+            return any(getattr(table, "name", None) in SHARDED_TABLES for table in find_tables(clause, include_crud=True))
+        return False
+
+@event.listens_for(RoutingSession, "before_commit")
+def _verify_shard_before_commit(session):
+    """Refuse to commit shard writes if the owner was moved meanwhile.
+
+    Flushing first makes any pending writes take the shard's lock, so a
+    migration either already waited for them or has set its flag by now.
+    """
+    shard = session.info.get("shard")
+    if shard is not None:
+        from app import sharding
+
+        session.flush()
+        sharding.verify_assignment(session, session.info["owner_id"], shard)
+
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Bump whenever the models change so init_db re-runs create_all and the
+# upgrade steps below. The applied version is stored in PRAGMA user_version.
+SCHEMA_VERSION = 4
+
+def bind_owner(db: Session, user_id: int):
+    """Route this session's transaction and rule statements to user_id's shard."""
+    db.info["owner_id"] = user_id
+    db.info.pop("shard", None)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+def _add_column_if_missing(connection, table: str, column: str, ddl: str):
+    columns = {row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+def _rebuild_with_autoincrement(connection, table):
+    """Recreate ``table`` with AUTOINCREMENT, keeping its rows and ids.
+
+    Plain INTEGER PRIMARY KEY tables hand out max(id) + 1, so the ids of
+    deleted rows come back. SQLite cannot add AUTOINCREMENT in place. The
+    table's triggers are dropped with it; recreate them afterwards.
+    """
+    from sqlalchemy.schema import CreateTable
+
+    sql = connection.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table.name,)
+    ).scalar()
+    if "AUTOINCREMENT" in sql.upper():
+        return
+    staging = f"{table.name}_rebuild"
+    columns = ", ".join(column.name for column in table.columns)
+    create = str(CreateTable(table).compile(dialect=connection.dialect))
+    connection.exec_driver_sql(create.replace(f"CREATE TABLE {table.name} ", f"CREATE TABLE {staging} ", 1))
+    connection.exec_driver_sql(f"INSERT INTO {staging} ({columns}) SELECT {columns} FROM {table.name}")
+    connection.exec_driver_sql(f"DROP TABLE {table.name}")
+    connection.exec_driver_sql(f"ALTER TABLE {staging} RENAME TO {table.name}")
+    for index in table.indexes:
+        index.create(connection)
+
+def id_sequence(connection, table: str) -> int:
+    """Highest id an AUTOINCREMENT table has handed out, deleted rows included."""
+    return connection.exec_driver_sql("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).scalar() or 0
+
+def raise_id_sequence(connection, table: str, value: int):
+    """Make an AUTOINCREMENT table hand out only ids above ``value`` from now on."""
+    current = connection.exec_driver_sql("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).scalar()
+    if current is None:
+        connection.exec_driver_sql("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table, value))
+    elif current < value:
+        connection.exec_driver_sql("UPDATE sqlite_sequence SET seq = ? WHERE name = ?", (value, table))
+
+def _upgrade(connection, from_version: int):
+    from app import archive, models
+    from app.search import ensure_fts_index
+
+    if from_version < 1:
+        # Databases created before conditional GET caching and full-text search
+        _add_column_if_missing(connection, "users", "data_version", "INTEGER NOT NULL DEFAULT 0")
+        ensure_fts_index(connection)
+    if from_version < 3:
+        # Archived transactions keep their ids, so the hot table must never reuse them
+        _rebuild_with_autoincrement(connection, models.Transaction.__table__)
+        ensure_fts_index(connection)
+        high_water = max(
+            connection.exec_driver_sql("SELECT coalesce(max(id), 0) FROM transactions").scalar(),
+            archive.max_archived_id(),
+        )
+        raise_id_sequence(connection, "transactions", high_water)
+    if from_version < 4:
+        # Flag that blocks a user's shard writes while migrate_user moves them
+        _add_column_if_missing(connection, "user_shards", "migrating", "BOOLEAN NOT NULL DEFAULT 0")
+
+def init_db(bind=None) -> bool:
+    """Create or upgrade the schema unless it is already at SCHEMA_VERSION.
+
+    Checking one pragma is much cheaper than an unconditional
+    ``create_all``, which reflects every table on every boot. Returns True if
+    the schema was changed.
+    """
+    from app import models  # noqa: F401 - registers the tables on Base.metadata
+
+    bind = bind or engine
+    with bind.begin() as connection:
+        if connection.dialect.name != "sqlite":
+            Base.metadata.create_all(bind=connection)
+            return True
+        # Take the write lock before looking, so workers (or shard engines in
+        # several processes) starting together don't race through create_all.
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        current = connection.exec_driver_sql("PRAGMA user_version").scalar()
+        if current >= SCHEMA_VERSION:
+            return False
+        fresh = connection.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE type = 'table'").first() is None
+        Base.metadata.create_all(bind=connection)
+        if not fresh:
+            # create_all alone builds the current schema for a new database
+            # (every new shard, too), so only existing ones need the steps
+            # below, some of which scan the whole archive.
+            _upgrade(connection, current)
+        connection.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return True
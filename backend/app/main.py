@@ -1,9 +1,11 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 
-from app.database import engine, Base, get_db
+from app.database import engine, Base, get_db, init_db
 from app.routers import transactions, auth
+from app.sharding import ShardMigrating
 from app.core.config import settings
 from app.models import User
 from app.crud import create_user, get_user_by_username
@@ -12,7 +14,7 @@ from sqlalchemy.orm import Session
 
 # Create database tables
 def create_db_and_tables():
-    Base.metadata.create_all(bind=engine)
+    schema_changed = init_db(engine)
     # You can add a default user here for testing if you want
     # with Session(engine) as session:
     #     default_user = get_user_by_username(session, "testuser")
@@ -20,13 +22,16 @@ def create_db_and_tables():
     #         user_in = UserCreate(username="testuser", password="testpassword")
     #         create_user(session, user_in)
     #         print("Default user 'testuser' created with password 'testpassword'")
+    return schema_changed
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     print("Starting up...")
-    create_db_and_tables()
-    print("Database tables created (if they didn't exist).")
+    if create_db_and_tables():
+        print("Database schema created or upgraded.")
+    else:
+        print("Database schema is up to date.")
     yield
     # Shutdown
     print("Shutting down...")
@@ -50,8 +55,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+@app.exception_handler(ShardMigrating)
+async def shard_migrating_handler(request: Request, exc: ShardMigrating):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": str(exc.retry_after)})
+
 # Include routers
 app.include_router(auth.router, prefix=f"{settings.API_V1_STR}/auth", tags=["Authentication"])
 app.include_router(transactions.router, prefix=f"{settings.API_V1_STR}/transactions", tags=["Transactions"])
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum as SAEnum
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Enum as SAEnum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -22,9 +22,19 @@ class User(Base): # For Bonus: Authentication
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
+    data_version = Column(Integer, default=0, nullable=False)  # Bumped on every transaction/rule write
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     transactions = relationship("Transaction", back_populates="owner")
+    rules = relationship("Rule", back_populates="owner")
+
+class UserShard(Base):
+    """Which shard holds a user's transactions and rules (see app.sharding)."""
+    __tablename__ = "user_shards"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    shard = Column(String, nullable=False, index=True)
+    migrating = Column(Boolean, default=False, nullable=False)  # Set while migrate_user moves the rows
 
 class Rule(Base):
     __tablename__ = "rules"
@@ -54,6 +64,8 @@ class Rule(Base):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    # Never reuse ids: archived rows keep theirs in Parquet (see app.archive)
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     date = Column(DateTime(timezone=True), nullable=False)
@@ -4,7 +4,7 @@ from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 
 from app import crud, schemas, models
-from app.database import get_db
+from app.database import bind_owner, get_db
 from app.core.config import settings
 from jose import JWTError, jwt
 
@@ -39,6 +39,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     user = crud.get_user_by_username(db, username=token_data.username)
     if user is None:
         raise credentials_exception
+    bind_owner(db, user.id)
     return user
 
 async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
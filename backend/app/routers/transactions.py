@@ -1,26 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Path
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Path, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List, Optional
-import pandas as pd
+from typing import List, Optional, Union
 import io
-from datetime import datetime
+from datetime import date, datetime
 
-from app import crud, schemas, models
+from app import crud, schemas, models, search
+from app.admission import AdmissionRejected, import_limiter
+from app.cache import cached_json_response, dump_json, render_json
 from app.database import get_db
+from app.sharding import ShardMigrating
 from app.routers.auth import get_current_active_user
 
 router = APIRouter()
 
-@router.post("/upload-csv/", summary="Upload bank statement CSV")
-async def upload_csv(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: Optional[models.User] = Depends(get_current_active_user)
-):
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail="Invalid file type. Please upload a CSV.")
+MAX_PAGE_SIZE = 10000
+
+def _import_csv(contents: bytes, db: Session, user_id: Optional[int]):
+    """Parse and store an uploaded CSV. Blocking; runs in the threadpool."""
+    import pandas as pd  # Deferred: only CSV uploads pay for the pandas import
+
     try:
-        contents = await file.read()
         df = pd.read_csv(io.BytesIO(contents))
 
         required_columns = {'Date', 'Description', 'Amount'}
@@ -32,23 +32,87 @@ async def upload_csv(
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Error parsing Date column: {str(e)}. Ensure dates are in a recognizable format.")
 
-        user_id = current_user.id if current_user else None
         result = crud.bulk_create_transactions_from_df(db, df, user_id=user_id)
         return result
     except pd.errors.EmptyDataError:
         raise HTTPException(status_code=400, detail="Uploaded CSV file is empty.")
+    except ShardMigrating:
+        raise
     except Exception as e:
         print(f"Error processing CSV: {e}")
         raise HTTPException(status_code=500, detail=f"Error processing CSV file: {str(e)}")
 
-@router.get("/", response_model=List[schemas.Transaction])
+@router.post("/upload-csv/", summary="Upload bank statement CSV")
+async def upload_csv(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: Optional[models.User] = Depends(get_current_active_user)
+):
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail="Invalid file type. Please upload a CSV.")
+    contents = await file.read()
+    user_id = current_user.id if current_user else None
+    # Imports are admitted a few at a time per worker and run off the event
+    # loop, so interactive reads keep their latency during import storms.
+    try:
+        async with import_limiter.slot():
+            return await run_in_threadpool(_import_csv, contents, db, user_id)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+@router.get("/", response_model=Union[List[schemas.Transaction], schemas.TransactionColumns])
 def read_transactions(
-    skip: int = 0, limit: int = 100, db: Session = Depends(get_db),
+    request: Request,
+    skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    list_format: schemas.ListFormatEnum = Query(
+        schemas.ListFormatEnum.ROWS, alias="format",
+        description="'columnar' returns parallel arrays with category codes, built without per-row validation"
+    ),
+    db: Session = Depends(get_db),
     current_user: Optional[models.User] = Depends(get_current_active_user)
 ):
     user_id = current_user.id if current_user else None
-    transactions = crud.get_transactions(db, user_id=user_id, skip=skip, limit=limit)
-    return transactions
+
+    def build():
+        if list_format == schemas.ListFormatEnum.COLUMNAR:
+            columns = crud.get_transaction_columns(db, user_id=user_id, skip=skip, limit=limit)
+            return dump_json({"categories": [c.value for c in models.TransactionCategoryEnum], **columns})
+        transactions = crud.get_transactions(db, user_id=user_id, skip=skip, limit=limit)
+        return render_json([schemas.Transaction.model_validate(t) for t in transactions])
+
+    params = {"skip": skip, "limit": limit, "format": list_format.value}
+    return cached_json_response(request, current_user, "transactions", params, build)
+
+@router.get("/search", response_model=schemas.TransactionSearchResponse)
+def search_transactions(
+    request: Request,
+    q: str = Query(..., min_length=search.MIN_TERM_LENGTH, description="Substring(s) to find in description or raw text"),
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    category: Optional[models.TransactionCategoryEnum] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_db),
+    current_user: Optional[models.User] = Depends(get_current_active_user)
+):
+    user_id = current_user.id if current_user else None
+
+    def build():
+        try:
+            items, next_cursor = search.search_transactions(
+                db, q, user_id=user_id, start=start, end=end, category=category, limit=limit, cursor=cursor
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return render_json(schemas.TransactionSearchResponse(
+            items=[schemas.Transaction.model_validate(t) for t in items], next_cursor=next_cursor
+        ))
+
+    params = {
+        "q": q, "start": start and start.isoformat(), "end": end and end.isoformat(),
+        "category": category and category.value, "limit": limit, "cursor": cursor,
+    }
+    return cached_json_response(request, current_user, "search", params, build)
 
 # Rule endpoints
 @router.get("/rules/", response_model=List[schemas.Rule])
@@ -105,11 +169,40 @@ def update_transaction_category_api(
 
 @router.get("/summary/monthly/{year}/{month}", response_model=schemas.MonthlySummaryResponse)
 def get_monthly_summary(
+    request: Request,
     year: int = Path(..., title="Year", ge=2000, le=datetime.now().year + 5),
     month: int = Path(..., title="Month", ge=1, le=12),
     db: Session = Depends(get_db),
     current_user: Optional[models.User] = Depends(get_current_active_user)
 ):
     user_id = current_user.id if current_user else None
-    summary_items = crud.get_monthly_spending_summary(db, year=year, month=month, user_id=user_id)
-    return schemas.MonthlySummaryResponse(month=f"{year}-{month:02d}", summary=summary_items)
+
+    def build():
+        summary_items = crud.get_monthly_spending_summary(db, year=year, month=month, user_id=user_id)
+        return render_json(schemas.MonthlySummaryResponse(month=f"{year}-{month:02d}", summary=summary_items))
+
+    return cached_json_response(request, current_user, "summary_monthly", {"year": year, "month": month}, build)
+
+@router.get("/summary/range", response_model=schemas.RangeSummaryResponse)
+def get_range_summary(
+    request: Request,
+    start: date = Query(..., description="First day of the range (inclusive)"),
+    end: date = Query(..., description="Last day of the range (inclusive)"),
+    bucket: schemas.SummaryBucketEnum = Query(schemas.SummaryBucketEnum.MONTH),
+    db: Session = Depends(get_db),
+    current_user: Optional[models.User] = Depends(get_current_active_user)
+):
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    user_id = current_user.id if current_user else None
+    version = current_user.data_version if current_user else 0
+
+    def build():
+        try:
+            buckets = crud.get_range_spending_summary(db, start=start, end=end, bucket=bucket, user_id=user_id, version=version)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return render_json(schemas.RangeSummaryResponse(start=start, end=end, bucket=bucket, buckets=buckets))
+
+    params = {"start": start.isoformat(), "end": end.isoformat(), "bucket": bucket.value}
+    return cached_json_response(request, current_user, "summary_range", params, build)
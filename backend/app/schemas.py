@@ -1,7 +1,8 @@
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional, List
 from app.models import TransactionCategoryEnum
+import enum
 
 class TransactionBase(BaseModel):
     date: datetime
@@ -25,6 +26,24 @@ class Transaction(TransactionBase):
     class Config:
         from_attributes = True
 
+class ListFormatEnum(str, enum.Enum):
+    ROWS = "rows"
+    COLUMNAR = "columnar"
+
+class TransactionColumns(BaseModel):
+    """Columnar transaction list: parallel arrays, one entry per transaction."""
+    categories: List[TransactionCategoryEnum]  # category[i] indexes into this list
+    id: List[int]
+    date: List[int]  # Seconds since the Unix epoch
+    description: List[Optional[str]]
+    amount: List[float]
+    raw_text: List[Optional[str]]
+    category: List[int]
+
+class TransactionSearchResponse(BaseModel):
+    items: List[Transaction]
+    next_cursor: Optional[str] = None
+
 class UserBase(BaseModel):
     username: str
 
@@ -52,6 +71,24 @@ class MonthlySummaryResponse(BaseModel):
     month: str
     summary: List[MonthlySummaryItem]
 
+class SummaryBucketEnum(str, enum.Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+    QUARTER = "quarter"
+    YEAR = "year"
+
+class RangeSummaryBucket(BaseModel):
+    period_start: date
+    total_amount: float
+    summary: List[MonthlySummaryItem]
+
+class RangeSummaryResponse(BaseModel):
+    start: date
+    end: date
+    bucket: SummaryBucketEnum
+    buckets: List[RangeSummaryBucket]
+
 # Rule schemas
 class RuleBase(BaseModel):
     name: str
@@ -73,8 +110,8 @@ class RuleUpdate(BaseModel):
 class Rule(RuleBase):
     id: int
     owner_id: Optional[int] = None
-    created_at: Optional[str] = None
-    updated_at: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -0,0 +1,202 @@
+"""Full-text search over transaction descriptions using SQLite FTS5.
+
+``transactions_fts`` is an external-content FTS5 table over
+``transactions.description`` and ``transactions.raw_text``. Triggers keep it
+in sync with single inserts, bulk imports, edits and deletes. The trigram
+tokenizer (SQLite >= 3.34) makes every quoted term a case-insensitive substring
+match, so "uber" finds "UBEREATS" and "myuber" just like the ``re.search``
+based rule engine does.
+
+Transactions moved to the Parquet archive (see ``app.archive``) are searched
+after the hot results, with the same substring semantics.
+"""
+import base64
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Tuple, Union
+
+from sqlalchemy import and_, column, event, literal_column, or_, table, text
+from sqlalchemy.orm import Query, Session
+
+from app import archive, models, schemas
+
+FTS_TABLE = "transactions_fts"
+MIN_TERM_LENGTH = 3  # Shorter terms have no trigrams and can never match
+
+fts = table(FTS_TABLE, column("rowid"), column("rank"))
+
+_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        description, raw_text, content='transactions', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON transactions BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, description, raw_text) VALUES (new.id, new.description, new.raw_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON transactions BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description, raw_text) VALUES ('delete', old.id, old.description, old.raw_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF description, raw_text ON transactions BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description, raw_text) VALUES ('delete', old.id, old.description, old.raw_text);
+        INSERT INTO {FTS_TABLE}(rowid, description, raw_text) VALUES (new.id, new.description, new.raw_text);
+    END""",
+]
+
+
+def ensure_fts_index(connection) -> None:
+    """Create the FTS table and triggers if missing, backfilling existing rows."""
+    if connection.dialect.name != "sqlite":
+        return
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+    ).first()
+    for statement in _DDL:
+        connection.execute(text(statement))
+    if not exists:
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+@event.listens_for(models.Transaction.__table__, "after_create")
+def _create_fts_index(target, connection, **kw):
+    ensure_fts_index(connection)
+
+
+def _quote(term: str) -> str:
+    return '"%s"' % term.replace('"', '""')
+
+
+def search_terms(search_text: str) -> List[str]:
+    terms = [term for term in search_text.split() if len(term) >= MIN_TERM_LENGTH]
+    if not terms:
+        raise ValueError(f"Search terms must be at least {MIN_TERM_LENGTH} characters long")
+    return terms
+
+
+def build_match_query(search_text: str) -> str:
+    """Turn free text into an FTS5 query requiring every term as a substring."""
+    return _match_all(search_terms(search_text))
+
+
+def _match_all(terms: List[str]) -> str:
+    return " ".join(_quote(term) for term in terms)
+
+
+_REGEX_SPECIAL = set("\\.^$*+?{}[]()|")
+
+
+def rule_match_query(pattern: str) -> Optional[str]:
+    """FTS5 query selecting every row a rule pattern could match, if one exists.
+
+    Only plain literals and alternations of literals (``uber|lyft``) can be
+    translated; anything else returns None and callers fall back to a scan.
+    Word-boundary anchors are dropped, which only widens the candidate set.
+    """
+    alternatives = []
+    for alternative in pattern.split("|"):
+        alternative = alternative.replace("\\b", "")
+        if len(alternative.strip()) < MIN_TERM_LENGTH or _REGEX_SPECIAL & set(alternative):
+            return None
+        alternatives.append(_quote(alternative))
+    return " OR ".join(alternatives)
+
+
+def filter_by_match(query: Query, match: str) -> Query:
+    """Restrict a Transaction query to rows matching an FTS5 query."""
+    return query.join(fts, fts.c.rowid == models.Transaction.id).filter(
+        literal_column(FTS_TABLE).op("MATCH")(match)
+    )
+
+
+_ARCHIVE_PHASE = "archive"
+
+
+def encode_cursor(rank: Optional[float], transaction_id: int) -> str:
+    """Encode a paging position; ``rank=None`` marks a position in the archive."""
+    phase = _ARCHIVE_PHASE if rank is None else repr(rank)
+    return base64.urlsafe_b64encode(f"{phase}:{transaction_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[float], int]:
+    try:
+        phase, transaction_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        return (None if phase == _ARCHIVE_PHASE else float(phase)), int(transaction_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def search_archive(
+    terms: List[str],
+    user_id: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    category: Optional[models.TransactionCategoryEnum] = None,
+    after_id: int = 0,
+    limit: int = 50,
+) -> List[schemas.Transaction]:
+    """Archived transactions containing every term, ordered by id."""
+    table = archive.read_archived(user_id, start, end)
+    if table is None or table.num_rows == 0:
+        return []
+
+    import pyarrow.compute as pc
+
+    mask = pc.greater(table["id"], after_id)
+    if category:
+        mask = pc.and_(mask, pc.equal(table["category"], category.value))
+    for term in terms:
+        in_description = pc.fill_null(pc.match_substring(table["description"], term, ignore_case=True), False)
+        in_raw_text = pc.fill_null(pc.match_substring(table["raw_text"], term, ignore_case=True), False)
+        mask = pc.and_(mask, pc.or_(in_description, in_raw_text))
+    matches = table.filter(mask).sort_by("id").slice(0, limit)
+    return [schemas.Transaction(**row) for row in matches.to_pylist()]
+
+
+def search_transactions(
+    db: Session,
+    search_text: str,
+    user_id: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    category: Optional[models.TransactionCategoryEnum] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Union[models.Transaction, schemas.Transaction]], Optional[str]]:
+    """Ranked search with keyset paging on (bm25 rank, id).
+
+    Hot rows come first in rank order, followed by archived matches in id
+    order. Returns the page of transactions and the cursor for the next page,
+    which is None once the results are exhausted.
+    """
+    terms = search_terms(search_text)
+    last_rank, last_id = decode_cursor(cursor) if cursor else (0.0, 0)
+    items = []
+    archive_after = last_id
+    if not cursor or last_rank is not None:
+        query = filter_by_match(db.query(models.Transaction, fts.c.rank), _match_all(terms))
+        if user_id:
+            query = query.filter(models.Transaction.owner_id == user_id)
+        if start:
+            query = query.filter(models.Transaction.date >= datetime.combine(start, time.min))
+        if end:
+            query = query.filter(models.Transaction.date < datetime.combine(end + timedelta(days=1), time.min))
+        if category:
+            query = query.filter(models.Transaction.category == category)
+        if cursor:
+            query = query.filter(or_(
+                fts.c.rank > last_rank,
+                and_(fts.c.rank == last_rank, models.Transaction.id > last_id),
+            ))
+
+        rows = query.order_by(fts.c.rank, models.Transaction.id).limit(limit + 1).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last_transaction, last_rank = rows[-1]
+            return [transaction for transaction, _ in rows], encode_cursor(last_rank, last_transaction.id)
+        items = [transaction for transaction, _ in rows]
+        archive_after = 0
+
+    remaining = limit - len(items)
+    archived = search_archive(terms, user_id, start, end, category, after_id=archive_after, limit=remaining + 1)
+    next_cursor = None
+    if len(archived) > remaining:
+        archived = archived[:remaining]
+        next_cursor = encode_cursor(None, archived[-1].id if archived else archive_after)
+    return items + archived, next_cursor
@@ -0,0 +1,302 @@
+"""Per-tenant sharding of transactions and rules across SQLite files.
+
+With ``SHARD_MODE`` set to ``per_user`` or ``hashed``, the ``transactions``
+and ``rules`` tables of each user live in a shard database under
+``SHARD_DIR``. Users, their data versions and the ``user_shards`` map stay
+in the main ``DATABASE_URL`` database. ``database.RoutingSession`` sends
+every statement that touches a sharded table to the engine of the session's
+owner (set by ``database.bind_owner`` once the user is authenticated). Each
+shard therefore has its own connection pool and write lock, so one heavy
+importer no longer blocks everybody else's writes.
+
+New users are assigned on first use: ``per_user`` gives every user their own
+file; ``hashed`` picks one of ``SHARD_COUNT`` files by a stable hash. The
+assignment is recorded in ``user_shards``, so users can be moved later without
+changing the hash. When sharding is turned on for an existing database, users
+who already have rows in the main database are assigned the ``main`` shard
+(the main database itself) and keep working from there until ``rebalance``
+moves them. Use the CLI to inspect or rebalance::
+
+    python -m app.sharding show
+    python -m app.sharding migrate --user 42 --to shard_3
+    python -m app.sharding rebalance
+
+Migrations are safe against running API workers. A session looks up its
+owner's shard once, and before committing it checks the assignment again
+after its writes hold the shard's lock. While ``user_shards.migrating`` is
+set, or once the user has moved, the session raises ``ShardMigrating``. The
+API answers that with 503, so no write lands on a shard nobody reads.
+"""
+import argparse
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, List
+
+from sqlalchemy import create_engine, delete, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app import models
+from app.core.config import settings
+
+SHARD_MODES = ("none", "per_user", "hashed")
+MAIN_SHARD = "main"
+SHARDED_TABLES = frozenset({models.Transaction.__tablename__, models.Rule.__tablename__})
+
+_engines: Dict[str, Engine] = {}
+_lock = threading.Lock()
+
+
+class ShardMigrating(Exception):
+    """The user's rows are being moved to another shard; retry shortly."""
+
+    retry_after = 1
+
+    def __init__(self, user_id: int):
+        super().__init__(f"User {user_id} is being moved to another shard, please retry.")
+        self.user_id = user_id
+
+
+def enabled() -> bool:
+    if settings.SHARD_MODE not in SHARD_MODES:
+        raise ValueError(f"SHARD_MODE must be one of {', '.join(SHARD_MODES)}, not '{settings.SHARD_MODE}'")
+    return settings.SHARD_MODE != "none"
+
+
+def default_shard(user_id: int) -> str:
+    """Shard a user is placed on under the current SHARD_MODE and SHARD_COUNT."""
+    if settings.SHARD_MODE == "per_user":
+        return f"user_{user_id}"
+    return f"shard_{zlib.crc32(str(user_id).encode()) % settings.SHARD_COUNT}"
+
+
+def shard_url(shard: str) -> str:
+    return f"sqlite:///{Path(settings.SHARD_DIR) / f'{shard}.db'}"
+
+
+def engine_for_shard(shard: str) -> Engine:
+    """Engine (and connection pool) for a shard, creating its schema on first use."""
+    if shard == MAIN_SHARD:
+        return _directory_engine()
+    engine = _engines.get(shard)
+    if engine is not None:
+        return engine
+    from app.database import init_db
+
+    with _lock:
+        engine = _engines.get(shard)
+        if engine is None:
+            Path(settings.SHARD_DIR).mkdir(parents=True, exist_ok=True)
+            engine = create_engine(shard_url(shard), connect_args={"check_same_thread": False, "timeout": 30})
+            init_db(engine)
+            _engines[shard] = engine
+    return engine
+
+
+def _assignment(connection, user_id: int):
+    return connection.execute(
+        select(models.UserShard.shard, models.UserShard.migrating).where(models.UserShard.user_id == user_id)
+    ).first()
+
+
+def _has_unsharded_rows(connection, user_id: int) -> bool:
+    """Whether the main database still holds rows the user wrote before sharding."""
+    return any(
+        connection.execute(select(table.c.id).where(table.c.owner_id == user_id).limit(1)).first()
+        for table in (models.Transaction.__table__, models.Rule.__table__)
+    )
+
+
+def unsharded_owners() -> List[int]:
+    """Users with transactions or rules still in the main database."""
+    owners = set()
+    with _directory_engine().connect() as connection:
+        for table in (models.Transaction.__table__, models.Rule.__table__):
+            owners.update(connection.execute(select(table.c.owner_id).where(table.c.owner_id.is_not(None)).distinct()).scalars())
+    return sorted(owners)
+
+
+def _assign(user_id: int):
+    """The user's assignment row, recording the initial one if there is none."""
+    with _directory_engine().begin() as connection:
+        row = _assignment(connection, user_id)
+        if row is None:
+            shard = MAIN_SHARD if _has_unsharded_rows(connection, user_id) else default_shard(user_id)
+            # Concurrent first requests (threads or workers) may race to assign
+            connection.execute(
+                sqlite_insert(models.UserShard)
+                .values(user_id=user_id, shard=shard, migrating=False)
+                .on_conflict_do_nothing(index_elements=["user_id"])
+            )
+            row = _assignment(connection, user_id)
+    return row
+
+
+def shard_for_user(user_id: int) -> str:
+    """Look up (or assign and record) the shard of a user.
+
+    Raises ShardMigrating while the user is being moved.
+    """
+    row = _assign(user_id)
+    if row.migrating:
+        raise ShardMigrating(user_id)
+    return row.shard
+
+
+def verify_assignment(db: Session, user_id: int, shard: str):
+    """Raise ShardMigrating unless ``user_id`` still lives on ``shard``, undisturbed.
+
+    Called before a session commits, after its writes hold the shard's lock.
+    """
+    row = _assignment(db, user_id)
+    if row is None or row.migrating or row.shard != shard:
+        raise ShardMigrating(user_id)
+
+
+def clear_caches():
+    """Dispose shard engines."""
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+
+def _set_assignment(user_id: int, **values):
+    shards = models.UserShard.__table__
+    with _directory_engine().begin() as connection:
+        connection.execute(shards.update().where(shards.c.user_id == user_id).values(**values))
+
+
+def _switch_assignment(connection, user_id: int, target: str):
+    users = models.User.__table__
+    connection.execute(
+        models.UserShard.__table__.update().where(models.UserShard.user_id == user_id)
+        .values(shard=target, migrating=False)
+    )
+    connection.execute(users.update().where(users.c.id == user_id).values(data_version=users.c.data_version + 1))
+
+
+def migrate_user(user_id: int, target: str) -> int:
+    """Move a user's transactions and rules to another shard.
+
+    1. Mark the user as migrating, so new sessions get ShardMigrating and
+       in-flight ones fail their pre-commit check instead of committing to
+       the source.
+    2. Take the source shard's write lock, which waits for writes already
+       holding it. Copy the rows to the target and commit there.
+    3. Switch the map to the target and clear the flag.
+    4. Delete exactly the copied rows from the source.
+
+    Row ids are reassigned by the target shard, as ids are only unique within
+    a shard. The target's id sequence is first raised past the source's and
+    the user's archived ids, so moved rows never take an id the user's
+    archive already uses. A rerun after a crash resumes safely: rows left on
+    the target by an unswitched copy are removed before copying, and pending
+    archive parts are resolved while the source is still authoritative.
+    Moving off the ``main`` shard switches the map in the same transaction
+    as the delete, since the map lives in the database being locked.
+    Returns the rows moved.
+    """
+    from app import archive
+    from app.database import id_sequence, raise_id_sequence
+
+    source = _assign(user_id).shard
+    if source == target:
+        return 0
+    source_engine, target_engine = engine_for_shard(source), engine_for_shard(target)
+    _set_assignment(user_id, migrating=True)
+
+    moved = 0
+    copied = []
+    try:
+        with source_engine.connect() as src:
+            src.exec_driver_sql("BEGIN IMMEDIATE")
+            # With the source locked no archive run can commit meanwhile
+            archive.recover_pending(src, user_id)
+            with target_engine.begin() as dst:
+                high_water = max(id_sequence(src, "transactions"), archive.max_archived_id(user_id))
+                raise_id_sequence(dst, "transactions", high_water)
+                for model in (models.Rule, models.Transaction):
+                    table = model.__table__
+                    dst.execute(delete(table).where(table.c.owner_id == user_id))
+                    rows = [dict(row._mapping) for row in src.execute(select(table).where(table.c.owner_id == user_id))]
+                    copied.append((table, [row.pop("id") for row in rows]))
+                    if rows:
+                        dst.execute(insert(table), rows)
+                    moved += len(rows)
+
+            if source == MAIN_SHARD:
+                _switch_assignment(src, user_id, target)
+            else:
+                with _directory_engine().begin() as connection:
+                    _switch_assignment(connection, user_id, target)
+
+            for table, ids in copied:
+                for offset in range(0, len(ids), 500):
+                    src.execute(delete(table).where(table.c.id.in_(ids[offset:offset + 500])))
+            src.commit()
+    except Exception:
+        with _directory_engine().connect() as connection:
+            unswitched = _assignment(connection, user_id).shard == source
+        if unswitched:
+            _set_assignment(user_id, migrating=False)
+        raise
+    return moved
+
+
+def rebalance() -> Dict[int, str]:
+    """Move every user whose recorded shard differs from ``default_shard``.
+
+    Run after turning sharding on or changing SHARD_MODE or SHARD_COUNT.
+    Users with rows left in the main database are assigned ``main`` first,
+    even if they have not made a request since, so their rows move too.
+    Returns the users moved and their new shard.
+    """
+    for user_id in unsharded_owners():
+        _assign(user_id)
+    with Session(_directory_engine()) as db:
+        assignments = db.query(models.UserShard.user_id, models.UserShard.shard).all()
+    moves = {user_id: default_shard(user_id) for user_id, shard in assignments if shard != default_shard(user_id)}
+    for user_id, target in moves.items():
+        migrate_user(user_id, target)
+    return moves
+
+
+def _directory_engine() -> Engine:
+    from app.database import engine
+
+    return engine
+
+
+def main():
+    from app.database import init_db
+
+    parser = argparse.ArgumentParser(description="Inspect and rebalance tenant shards.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("show", help="print the shard map")
+    migrate = commands.add_parser("migrate", help="move one user to another shard")
+    migrate.add_argument("--user", type=int, required=True)
+    migrate.add_argument("--to", required=True, help="target shard name, e.g. shard_3 or user_42")
+    commands.add_parser("rebalance", help="move users to the shard the current settings assign them")
+    args = parser.parse_args()
+
+    if not enabled():
+        parser.error("SHARD_MODE is 'none'; set it to 'per_user' or 'hashed' first")
+    init_db()
+    if args.command == "show":
+        with Session(_directory_engine()) as db:
+            rows = db.query(models.UserShard.user_id, models.UserShard.shard, models.UserShard.migrating)
+            for user_id, shard, migrating in rows.order_by(models.UserShard.user_id):
+                print(f"user {user_id}: {shard}{' (migrating)' if migrating else ''}")
+    elif args.command == "migrate":
+        moved = migrate_user(args.user, args.to)
+        print(f"moved {moved} rows of user {args.user} to {args.to}")
+    else:
+        for user_id, shard in rebalance().items():
+            print(f"user {user_id} -> {shard}")
+
+
+if __name__ == "__main__":
+    main()
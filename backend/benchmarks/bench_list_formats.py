@@ -0,0 +1,87 @@
+"""Latency and payload size of GET /transactions/ by response format.
+
+Seeds one user with ``--rows`` transactions in a scratch database, then times
+the default per-row pydantic response against ``?format=columnar`` for a
+range of page sizes. The ETag response cache is disabled so every request
+does the full query and serialization.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_list_formats --rows 20000 --limits 100 1000 10000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def seed(rows: int) -> str:
+    """Create a user with ``rows`` transactions; return a bearer token."""
+    from sqlalchemy import insert
+
+    from app import models
+    from app.database import SessionLocal, bind_owner, init_db
+    from app.routers.auth import create_access_token
+
+    init_db()
+    categories = list(models.TransactionCategoryEnum)
+    with SessionLocal() as db:
+        user = models.User(username="bench", hashed_password="x")
+        db.add(user)
+        db.commit()
+        bind_owner(db, user.id)
+        start = datetime(2020, 1, 1)
+        db.execute(insert(models.Transaction), [
+            {
+                "date": start + timedelta(hours=i), "description": f"Merchant {i % 997} purchase",
+                "amount": -((i % 5000) / 100.0), "raw_text": f"POS {i:08d} MERCHANT {i % 997}",
+                "category": categories[i % len(categories)], "owner_id": user.id,
+            }
+            for i in range(rows)
+        ])
+        db.commit()
+        username = user.username
+    return create_access_token({"sub": username}, expires_delta=timedelta(hours=1))
+
+
+def measure(client, headers, params, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get("/api/v1/transactions/", params=params, headers=headers)
+        timings.append(time.perf_counter() - started)
+        response.raise_for_status()
+    return statistics.median(timings), len(response.content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000, help="transactions to seed")
+    parser.add_argument("--limits", type=int, nargs="+", default=[100, 1000, 10000], help="page sizes to request")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ["DATABASE_URL"] = os.environ["SQLALCHEMY_DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+        os.environ["RESPONSE_CACHE_MAX_BYTES"] = "0"
+        from fastapi.testclient import TestClient
+
+        from app.cache import orjson
+        from app.main import app
+
+        token = seed(args.rows)
+        headers = {"Authorization": f"Bearer {token}"}
+        print(f"json encoder for columnar: {'orjson' if orjson else 'stdlib json'}")
+        print(f"{'limit':>7} {'rows ms':>9} {'columnar ms':>12} {'speedup':>8} {'rows KiB':>9} {'columnar KiB':>13}")
+        with TestClient(app) as client:
+            for limit in args.limits:
+                rows_time, rows_size = measure(client, headers, {"limit": limit}, args.repeat)
+                col_time, col_size = measure(client, headers, {"limit": limit, "format": "columnar"}, args.repeat)
+                print(f"{limit:>7} {rows_time * 1000:>9.1f} {col_time * 1000:>12.1f} {rows_time / col_time:>7.1f}x "
+                      f"{rows_size / 1024:>9.0f} {col_size / 1024:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Concurrent multi-user import throughput versus number of shards.
+
+Every user runs in its own process and imports ``--batches`` CSV-sized
+batches of ``--rows`` transactions, committing each batch like an upload
+would. With one shard all importers queue on a single SQLite write lock;
+with more hashed shards, importers on different files proceed in parallel.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_sharding --users 8 --shards 1 2 4 8
+"""
+import argparse
+import multiprocessing
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from benchmarks.common import BACKEND_DIR, scratch_env
+
+
+def import_worker(user_id: int, batches: int, rows: int, start_barrier) -> None:
+    from app import crud, models
+    from app.database import SessionLocal, bind_owner
+
+    start_barrier.wait()
+    with SessionLocal() as db:
+        bind_owner(db, user_id)
+        day = datetime(2025, 1, 1)
+        for batch in range(batches):
+            db.add_all([
+                models.Transaction(
+                    date=day + timedelta(minutes=i), description=f"Import {batch}-{i}",
+                    amount=-1.0 - i % 50, owner_id=user_id,
+                )
+                for i in range(rows)
+            ])
+            crud.bump_data_version(db, user_id)
+            db.commit()
+
+
+def run_once(users: int, batches: int, rows: int) -> float:
+    """Run inside a configured subprocess; return elapsed seconds."""
+    from app import models
+    from app.database import SessionLocal, init_db
+
+    init_db()
+    with SessionLocal() as db:
+        user_ids = []
+        for n in range(users):
+            user = models.User(username=f"bench{n}", hashed_password="x")
+            db.add(user)
+            db.flush()
+            user_ids.append(user.id)
+        db.commit()
+
+    context = multiprocessing.get_context("fork" if sys.platform != "win32" else "spawn")
+    barrier = context.Barrier(users + 1)
+    workers = [context.Process(target=import_worker, args=(uid, batches, rows, barrier)) for uid in user_ids]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    if any(worker.exitcode for worker in workers):
+        raise RuntimeError("an import worker failed")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--batches", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=500, help="transactions per batch")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(run_once(args.users, args.batches, args.rows))
+        return
+
+    total_rows = args.users * args.batches * args.rows
+    print(f"{args.users} concurrent importers, {total_rows} rows total")
+    print(f"{'shards':>8} {'seconds':>9} {'rows/s':>10} {'speedup':>8}")
+    baseline = None
+    for shard_count in args.shards:
+        with tempfile.TemporaryDirectory() as workdir:
+            env = scratch_env(
+                workdir,
+                SHARD_MODE="hashed",
+                SHARD_COUNT=str(shard_count),
+                SHARD_DIR=str(Path(workdir) / "shards"),
+            )
+            cmd = [sys.executable, "-m", "benchmarks.bench_sharding", "--child",
+                   "--users", str(args.users), "--batches", str(args.batches), "--rows", str(args.rows)]
+            output = subprocess.run(cmd, cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+            if output.returncode:
+                sys.exit(f"benchmark with {shard_count} shard(s) failed:\n{output.stderr}")
+            elapsed = float(output.stdout.strip().splitlines()[-1])
+        baseline = baseline or elapsed
+        print(f"{shard_count:>8} {elapsed:>9.2f} {total_rows / elapsed:>10.0f} {baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
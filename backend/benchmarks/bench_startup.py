@@ -0,0 +1,72 @@
+"""Cold-start benchmark: import cost and time-to-first-request.
+
+Reports the slowest modules from ``python -X importtime -c "import app.main"``,
+whether heavy optional modules were pulled in at import time, and the wall time
+from launching uvicorn until the API answers its first request.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_startup --runs 5 --top 15
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+from benchmarks.common import BACKEND_DIR, running_server, wait_until_ready
+
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[int, int, str]]:
+    """Parse ``-X importtime`` lines into (self_us, cumulative_us, module)."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        entries.append((int(self_us), int(cumulative_us), module.rstrip()))
+    return entries
+
+
+def importtime_report(module: str = "app.main") -> Tuple[List[Tuple[int, int, str]], List[str]]:
+    probe = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    loaded = [m for m in result.stdout.strip().split(",") if m]
+    return parse_importtime(result.stderr), loaded
+
+
+def time_to_first_request() -> float:
+    started = time.perf_counter()
+    with running_server() as (base_url, _):
+        wait_until_ready(f"{base_url}/api/v1")
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3, help="server launches to average over")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    args = parser.parse_args()
+
+    entries, loaded = importtime_report()
+    total_us = max(cumulative for _, cumulative, _ in entries)
+    print(f"import app.main: {total_us / 1000:.1f} ms cumulative")
+    print(f"heavy modules loaded at import: {', '.join(loaded) or 'none'}")
+    print(f"\n{'cumulative ms':>14} {'self ms':>9}  module")
+    for self_us, cumulative_us, name in sorted(entries, key=lambda e: e[1], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+    timings = [time_to_first_request() for _ in range(args.runs)]
+    print(f"\ntime to first request over {args.runs} runs: "
+          f"median {statistics.median(timings) * 1000:.0f} ms, "
+          f"min {min(timings) * 1000:.0f} ms, max {max(timings) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Helpers shared by the benchmark scripts.
+
+Run benchmarks from the ``backend`` directory, e.g.
+``python -m benchmarks.bench_startup``.
+"""
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def scratch_env(workdir: str, **overrides: str) -> Dict[str, str]:
+    """Environment pointing the app at a throwaway database in ``workdir``."""
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{Path(workdir) / 'bench.db'}"
+    env["SQLALCHEMY_DATABASE_URL"] = env["DATABASE_URL"]
+    env["PYTHONPATH"] = str(BACKEND_DIR)
+    env.update(overrides)
+    return env
+
+
+def wait_until_ready(url: str, timeout: float = 30.0, interval: float = 0.01) -> float:
+    """Poll ``url`` until it answers 200; return the seconds waited."""
+    started = time.perf_counter()
+    while True:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter() - started
+        except OSError:
+            pass
+        if time.perf_counter() - started > timeout:
+            raise TimeoutError(f"{url} not ready after {timeout}s")
+        time.sleep(interval)
+
+
+@contextmanager
+def running_server(env: Optional[Dict[str, str]] = None, workers: int = 1) -> Iterator[Tuple[str, subprocess.Popen]]:
+    """Launch ``uvicorn app.main:app`` on a free port; yield (base_url, process)."""
+    port = free_port()
+    with tempfile.TemporaryDirectory() as workdir:
+        cmd = [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning",
+        ]
+        process = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env or scratch_env(workdir))
+        try:
+            yield f"http://127.0.0.1:{port}", process
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
@@ -0,0 +1,203 @@
+"""Mixed-workload load test for the API.
+
+Launches ``uvicorn app.main:app`` on a scratch database (or targets ``--url``)
+and drives it with ``--users`` concurrent virtual users for ``--duration``
+seconds. Each user registers and logs in, then loops over a weighted mix of
+operations:
+
+* ``login``     - POST /auth/token
+* ``upload``    - POST /transactions/upload-csv/ with ``--upload-rows`` rows
+* ``browse``    - GET /transactions/ (a random page)
+* ``summarize`` - GET /transactions/summary/monthly and /summary/range
+
+Per operation it reports request count, error rate, 503 (shed by import
+admission control) rate, p50/p95/p99 latency and throughput.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.loadtest --users 32 --duration 30 --mix browse=6,summarize=3,upload=1
+    python -m benchmarks.loadtest --workers 4 --env MAX_CONCURRENT_IMPORTS=1
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List
+
+from benchmarks.common import running_server, scratch_env, wait_until_ready
+
+API = "/api/v1"
+DEFAULT_MIX = "login=1,upload=1,browse=6,summarize=3"
+DESCRIPTIONS = ["Starbucks Coffee", "Uber Ride", "Walmart Grocery", "Netflix", "Shell Gas", "Amazon Order"]
+
+
+class Recorder:
+    """Latencies and status codes per operation name."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.shed: Dict[str, int] = defaultdict(int)
+
+    def record(self, op: str, seconds: float, status: int):
+        self.latencies[op].append(seconds)
+        if status == 503:
+            self.shed[op] += 1
+        elif status >= 400:
+            self.errors[op] += 1
+
+    def report(self, elapsed: float):
+        print(f"{'op':<10} {'count':>7} {'err %':>6} {'503 %':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>7}")
+        for op in sorted(self.latencies):
+            timings = sorted(self.latencies[op])
+            count = len(timings)
+            print(f"{op:<10} {count:>7} {100 * self.errors[op] / count:>6.1f} {100 * self.shed[op] / count:>6.1f} "
+                  f"{percentile(timings, 50) * 1000:>8.1f} {percentile(timings, 95) * 1000:>8.1f} "
+                  f"{percentile(timings, 99) * 1000:>8.1f} {count / elapsed:>7.1f}")
+
+
+def percentile(sorted_values: List[float], pct: int) -> float:
+    if len(sorted_values) < 2:
+        return sorted_values[0]
+    return statistics.quantiles(sorted_values, n=100, method="inclusive")[pct - 1]
+
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in OPERATIONS:
+            raise SystemExit(f"unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def statement_csv(rows: int) -> bytes:
+    start = date.today() - timedelta(days=365)
+    lines = ["Date,Description,Amount,RawText"]
+    for _ in range(rows):
+        day = start + timedelta(days=random.randrange(365))
+        description = random.choice(DESCRIPTIONS)
+        lines.append(f"{day.isoformat()},{description},-{random.uniform(1, 200):.2f},POS {random.randrange(10**8):08d} {description}")
+    return ("\n".join(lines) + "\n").encode()
+
+
+class VirtualUser:
+    def __init__(self, client, recorder: Recorder, upload_rows: int):
+        self.client = client
+        self.recorder = recorder
+        self.upload_rows = upload_rows
+        self.username = f"load-{uuid.uuid4().hex[:12]}"
+        self.password = "load-test-password"
+        self.headers: Dict[str, str] = {}
+
+    async def timed(self, op: str, method: str, path: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, API + path, **kwargs)
+            status = response.status_code
+        except Exception:
+            response, status = None, 599
+        self.recorder.record(op, time.perf_counter() - started, status)
+        return response
+
+    async def register(self):
+        await self.client.post(f"{API}/auth/register", json={"username": self.username, "password": self.password})
+        await self.login()
+
+    async def login(self):
+        response = await self.timed(
+            "login", "POST", "/auth/token", data={"username": self.username, "password": self.password}
+        )
+        if response is not None and response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def upload(self):
+        files = {"file": ("statement.csv", statement_csv(self.upload_rows), "text/csv")}
+        await self.timed("upload", "POST", "/transactions/upload-csv/", files=files, headers=self.headers)
+
+    async def browse(self):
+        params = {"skip": random.randrange(0, 500, 50), "limit": 50}
+        await self.timed("browse", "GET", "/transactions/", params=params, headers=self.headers)
+
+    async def summarize(self):
+        today = date.today()
+        if random.random() < 0.5:
+            await self.timed("summarize", "GET", f"/transactions/summary/monthly/{today.year}/{today.month}",
+                             headers=self.headers)
+        else:
+            params = {"start": (today - timedelta(days=365)).isoformat(), "end": today.isoformat(), "bucket": "week"}
+            await self.timed("summarize", "GET", "/transactions/summary/range", params=params, headers=self.headers)
+
+
+OPERATIONS = {
+    "login": VirtualUser.login,
+    "upload": VirtualUser.upload,
+    "browse": VirtualUser.browse,
+    "summarize": VirtualUser.summarize,
+}
+
+
+async def run_user(user: VirtualUser, mix: Dict[str, int], deadline: float, think: float):
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        await OPERATIONS[random.choices(names, weights)[0]](user)
+        if think:
+            await asyncio.sleep(random.uniform(0, 2 * think))
+
+
+async def drive(base_url: str, args) -> None:
+    import httpx
+
+    mix = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        users = [VirtualUser(client, Recorder(), args.upload_rows) for _ in range(args.users)]
+        await asyncio.gather(*(user.register() for user in users))
+        if not any(user.headers for user in users):
+            raise SystemExit(f"no virtual user could log in to {base_url}; is the app healthy?")
+        # Only the steady-state loop counts towards the report
+        recorder = Recorder()
+        for user in users:
+            user.recorder = recorder
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(run_user(user, mix, deadline, args.think) for user in users))
+        elapsed = time.perf_counter() - started
+
+    print(f"{args.users} users, {elapsed:.1f}s, mix {args.mix}")
+    recorder.report(elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="target a running server instead of launching one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the launched server")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra settings for the launched server, e.g. MAX_CONCURRENT_IMPORTS=1")
+    parser.add_argument("--users", type=int, default=16, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of steady-state load")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="weighted operations, e.g. browse=6,upload=1")
+    parser.add_argument("--upload-rows", type=int, default=500, help="rows per uploaded CSV")
+    parser.add_argument("--think", type=float, default=0.0, help="mean seconds a user pauses between operations")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    args = parser.parse_args()
+
+    if args.url:
+        asyncio.run(drive(args.url.rstrip("/"), args))
+        return
+    overrides = dict(item.split("=", 1) for item in args.env)
+    with tempfile.TemporaryDirectory() as workdir:
+        env = scratch_env(workdir, SHARD_DIR=f"{workdir}/shards", ARCHIVE_DIR=f"{workdir}/archive", **overrides)
+        with running_server(env, workers=args.workers) as (base_url, _):
+            wait_until_ready(f"{base_url}/api/v1")
+            asyncio.run(drive(base_url, args))
+
+
+if __name__ == "__main__":
+    main()
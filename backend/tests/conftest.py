@@ -1,45 +1,81 @@
 import pytest
+from datetime import timedelta
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
+from app import database
 from app.main import app
-from app.database import Base
 from app.core.config import settings
+from app.database import Base, get_db
 
-# Create a test database URL
-SQLALCHEMY_DATABASE_URL_TEST = "sqlite:///./test.db"
 
-# Create a new database engine for testing
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL_TEST, connect_args={"check_same_thread": False}
-)
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """Create a fresh SQLite database for each test and point the app at it"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(database, "engine", engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def archive_dir(tmp_path, monkeypatch):
+    """Keep every test away from a real ./archive in the working directory"""
+    monkeypatch.setattr(settings, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    return tmp_path / "archive"
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Each test starts from a fresh database, so drop cached responses and cubes"""
+    from app.analytics import cube_cache
+    from app.cache import response_cache
 
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    response_cache.clear()
+    cube_cache.invalidate()
+    yield
+    response_cache.clear()
+    cube_cache.invalidate()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Create all tables for testing
-Base.metadata.create_all(bind=engine)
 
 # Dependency override for testing
 @pytest.fixture
-def db():
+def db(session_factory):
     """Yield a test database session"""
+    db = session_factory()
     try:
-        db = TestingSessionLocal()
         yield db
     finally:
         db.close()
 
 # Test client fixture
 @pytest.fixture
-def client():
-    """Yield a test client"""
-    return TestClient(app)
+def client(session_factory):
+    """Yield a test client that uses the test database"""
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
 
 # Create a test user fixture
 @pytest.fixture
 def test_user(db):
     from app import crud, schemas
-    
+
     user_data = schemas.UserCreate(
         username="testuser",
         password="testpassword"
@@ -48,10 +84,10 @@ def test_user(db):
 
 # Create a test token fixture
 @pytest.fixture
-def test_token(db, test_user):
-    from app import crud
-    
-    token = crud.create_access_token(
+def test_token(test_user):
+    from app.routers.auth import create_access_token
+
+    token = create_access_token(
         data={"sub": test_user.username},
         expires_delta=timedelta(minutes=30)
     )
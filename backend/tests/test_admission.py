@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+from app.admission import AdmissionRejected, ConcurrencyLimiter
+
+
+def test_limiter_queues_then_rejects_excess():
+    """Test excess requests wait up to the queue limit and are rejected beyond it"""
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queued=1, queue_timeout=5)
+        release = asyncio.Event()
+        order = []
+
+        async def job(name):
+            async with limiter.slot():
+                order.append(name)
+                await release.wait()
+
+        first = asyncio.create_task(job("first"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(job("second"))
+        await asyncio.sleep(0)
+        assert (limiter.active, limiter.queued) == (1, 1)
+
+        with pytest.raises(AdmissionRejected):
+            async with limiter.slot():
+                pass
+
+        release.set()
+        await asyncio.gather(first, second)
+        assert order == ["first", "second"]
+        assert (limiter.active, limiter.queued) == (0, 0)
+
+    asyncio.run(scenario())
+
+
+def test_limiter_rejects_after_queue_timeout():
+    """Test queued requests give up after the queue timeout"""
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queued=4, queue_timeout=0.01)
+        async with limiter.slot():
+            with pytest.raises(AdmissionRejected) as excinfo:
+                async with limiter.slot():
+                    pass
+        assert excinfo.value.retry_after == 1
+        assert limiter.queued == 0
+
+    asyncio.run(scenario())
+
+
+def test_limiter_works_across_event_loops():
+    """Test one limiter can queue requests in successive event loops"""
+    limiter = ConcurrencyLimiter(max_concurrent=1, max_queued=4, queue_timeout=5)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def job():
+            async with limiter.slot():
+                await release.wait()
+
+        first = asyncio.create_task(job())
+        await asyncio.sleep(0)
+        second = asyncio.create_task(job())
+        await asyncio.sleep(0)
+        assert limiter.queued == 1
+        release.set()
+        await asyncio.gather(first, second)
+
+    asyncio.run(scenario())
+    asyncio.run(scenario())
+
@@ -0,0 +1,188 @@
+import threading
+import pytest
+from datetime import date, datetime, timedelta
+from app import analytics, crud, models
+
+FOOD = models.TransactionCategoryEnum.FOOD_DRINK
+TRANSPORT = models.TransactionCategoryEnum.TRANSPORT
+INCOME = models.TransactionCategoryEnum.INCOME
+
+
+def make_cube():
+    return analytics.UserCube.from_rows([
+        (datetime(2025, 5, 2), -30.0, TRANSPORT),
+        (datetime(2025, 4, 30), -10.0, FOOD),
+        (datetime(2025, 5, 1), -50.0, FOOD),
+        (datetime(2025, 5, 3), 1000.0, INCOME),
+        (datetime(2025, 7, 15), -20.0, FOOD),
+    ])
+
+
+def totals_by_category(totals):
+    return {analytics.CATEGORIES[code]: total for code, total in enumerate(totals) if total}
+
+
+def test_cube_is_sorted_by_day():
+    """Test rows are kept in date order for searchsorted"""
+    cube = make_cube()
+    assert list(cube.days) == sorted(cube.days)
+    assert len(cube) == 5
+
+
+def test_monthly_buckets_include_empty_months():
+    """Test month buckets cover the whole range and only count spending"""
+    buckets = make_cube().summarize(date(2025, 4, 1), date(2025, 7, 31), "month")
+
+    assert [start for start, _ in buckets] == [date(2025, 4, 1), date(2025, 5, 1), date(2025, 6, 1), date(2025, 7, 1)]
+    assert totals_by_category(buckets[1][1]) == {FOOD: -50.0, TRANSPORT: -30.0}
+    assert totals_by_category(buckets[2][1]) == {}
+    assert totals_by_category(buckets[3][1]) == {FOOD: -20.0}
+
+
+@pytest.mark.parametrize(
+    "bucket,expected_starts",
+    [
+        ("week", [date(2025, 4, 28)]),
+        ("quarter", [date(2025, 4, 1)]),
+        ("year", [date(2025, 1, 1)]),
+    ]
+)
+def test_bucket_boundaries(bucket, expected_starts):
+    """Test week buckets start on Monday and larger buckets align to the calendar"""
+    buckets = make_cube().summarize(date(2025, 4, 30), date(2025, 5, 3), bucket)
+    assert [start for start, _ in buckets] == expected_starts
+    assert totals_by_category(buckets[0][1]) == {FOOD: -60.0, TRANSPORT: -30.0}
+
+
+def test_merged_sorts_out_of_order_rows():
+    """Test merging imported rows keeps the cube sorted and leaves the original intact"""
+    original = make_cube()
+    cube = original.merged(analytics.UserCube.from_rows([(datetime(2025, 1, 5), -5.0, FOOD)]), version=2)
+
+    assert cube.version == 2
+    assert len(original) == 5 and len(cube) == 6
+    assert list(cube.days) == sorted(cube.days)
+    buckets = cube.summarize(date(2025, 1, 1), date(2025, 12, 31), "year")
+    assert totals_by_category(buckets[0][1])[FOOD] == -85.0
+
+
+def test_cube_cache_evicts_least_recently_used():
+    """Test the cube cache stays under its memory cap"""
+    cache = analytics.CubeCache(max_bytes=make_cube().nbytes * 2)
+    for user_id in (1, 2, 3):
+        cache._store(user_id, make_cube())
+
+    assert list(cache._cubes) == [2, 3]
+
+
+def test_extend_while_summarizing():
+    """Test readers never see a cube that an import is extending"""
+    cache = analytics.CubeCache(max_bytes=1 << 30)
+    cache._store(1, analytics.UserCube.from_rows([(datetime(2025, 1, 1), -1.0, FOOD)] * 1000))
+    batch = [(datetime(2025, 1, 1) + timedelta(days=i % 365), -1.0, FOOD) for i in range(1000)]
+    errors = []
+
+    def import_batches():
+        for version in range(1, 101):
+            cache.extend(1, batch, version)
+
+    writer = threading.Thread(target=import_batches)
+    writer.start()
+    while writer.is_alive():
+        cube = cache._cubes[1]
+        try:
+            (_, totals), = cube.summarize(date(2025, 1, 1), date(2025, 12, 31), "year")
+            assert -totals.sum() == len(cube)
+        except Exception as e:  # collected so the writer thread is still joined
+            errors.append(e)
+    writer.join()
+
+    assert errors == []
+    assert len(cache._cubes[1]) == 101000
+
+
+def test_extend_skips_cube_that_already_holds_the_import():
+    """Test extend uses row ids to tell whether a cube predates the import"""
+    cache = analytics.CubeCache(max_bytes=1 << 30)
+    rows = [(datetime(2025, 5, 1), -20.0, FOOD)]
+
+    # Holds the import's row but tagged with the version before it
+    cache._store(1, analytics.UserCube.from_rows(rows, version=1, max_id=7))
+    cache.extend(1, rows, version=2, ids=[7])
+    assert 1 not in cache._cubes
+
+    # Tagged with the import's version but read before its rows were visible
+    cache._store(1, analytics.UserCube.from_rows([], version=2, max_id=6))
+    cache.extend(1, rows, version=2, ids=[7])
+    assert len(cache._cubes[1]) == 1 and cache._cubes[1].max_id == 7
+
+
+def test_cube_loaded_between_import_commit_and_extend(db, test_user, monkeypatch):
+    """Test a request with a stale version cannot make extend count an import twice"""
+    import pandas as pd
+
+    cache = analytics.cube_cache
+    stale_version = test_user.data_version
+    extend = cache.extend
+
+    def late_extend(*args):
+        # A range request authenticated before the import loads the cube now
+        cache.get(db, test_user.id, stale_version)
+        extend(*args)
+
+    monkeypatch.setattr(cache, "extend", late_extend)
+    df = pd.DataFrame({"Date": pd.to_datetime(["2025-05-01"]), "Description": ["Lunch"], "Amount": [-20.0]})
+    crud.bulk_create_transactions_from_df(db, df, user_id=test_user.id)
+
+    db.refresh(test_user)
+    cube = cache._cubes[test_user.id]
+    assert cube.version == test_user.data_version
+    (_, totals), = cube.summarize(date(2025, 5, 1), date(2025, 5, 31), "month")
+    assert totals.sum() == -20.0
+
+
+def test_upload_extends_cached_cube(client, test_user, test_token, monkeypatch):
+    """Test a CSV import extends the cached cube instead of forcing a reload"""
+    headers = {"Authorization": f"Bearer {test_token}"}
+    params = {"start": "2025-05-01", "end": "2025-06-30", "bucket": "month"}
+    loads = []
+    load_cube = analytics.load_cube
+    monkeypatch.setattr(analytics, "load_cube", lambda *args: loads.append(args) or load_cube(*args))
+
+    def upload(csv_content):
+        response = client.post(
+            "/api/v1/transactions/upload-csv/",
+            files={"file": ("statement.csv", csv_content, "text/csv")},
+            headers=headers
+        )
+        assert response.status_code == 200
+
+    upload(b"Date,Description,Amount\n2025-05-01,Lunch,-12.5\n")
+    client.get("/api/v1/transactions/summary/range", params=params, headers=headers)
+    upload(b"Date,Description,Amount\n2025-06-03,Dinner,-20.0\n")
+    response = client.get("/api/v1/transactions/summary/range", params=params, headers=headers)
+
+    assert len(loads) == 1
+    assert [b["total_amount"] for b in response.json()["buckets"]] == [-12.5, -20.0]
+
+
+def test_range_summary_endpoint(client, db, test_user, test_token):
+    """Test the range summary endpoint buckets uploaded transactions"""
+    headers = {"Authorization": f"Bearer {test_token}"}
+    csv_content = b"Date,Description,Amount\n2025-05-01,Lunch,-12.5\n2025-06-03,Dinner,-20.0\n"
+    response = client.post(
+        "/api/v1/transactions/upload-csv/",
+        files={"file": ("statement.csv", csv_content, "text/csv")},
+        headers=headers
+    )
+    assert response.status_code == 200
+
+    response = client.get(
+        "/api/v1/transactions/summary/range",
+        params={"start": "2025-05-01", "end": "2025-06-30", "bucket": "month"},
+        headers=headers
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [b["period_start"] for b in data["buckets"]] == ["2025-05-01", "2025-06-01"]
+    assert [b["total_amount"] for b in data["buckets"]] == [-12.5, -20.0]
@@ -0,0 +1,114 @@
+import pytest
+from datetime import date, datetime
+from app import analytics, archive, crud, models, schemas, search
+
+pytest.importorskip("pyarrow")
+
+FOOD = models.TransactionCategoryEnum.FOOD_DRINK
+
+
+@pytest.fixture
+def transactions(db, test_user):
+    rows = [
+        (datetime(2023, 1, 10), "Uber Trip January", -10.0),
+        (datetime(2023, 2, 5), "Uber Trip February", -20.0),
+        (datetime(2025, 5, 1), "Uber Trip May", -30.0),
+    ]
+    for when, description, amount in rows:
+        db.add(models.Transaction(date=when, description=description, amount=amount, category=FOOD, owner_id=test_user.id))
+    db.commit()
+
+
+def test_archive_moves_old_rows_into_monthly_partitions(db, test_user, archive_dir, transactions):
+    """Test old rows leave the hot table and land in per-month Parquet files"""
+    moved = archive.archive_transactions(db, datetime(2024, 1, 1), test_user.id)
+
+    assert moved == 2
+    assert db.query(models.Transaction).count() == 1
+    months = sorted(p.name for p in (archive_dir / f"user={test_user.id}").iterdir())
+    assert months == ["month=2023-01", "month=2023-02"]
+
+
+def test_partition_pruning(db, test_user, archive_dir, transactions):
+    """Test only partitions overlapping the range are opened"""
+    archive.archive_transactions(db, datetime(2024, 1, 1), test_user.id)
+
+    files = archive.partition_files(test_user.id, date(2023, 2, 1), date(2023, 12, 31))
+    assert [f.parent.name for f in files] == ["month=2023-02"]
+
+
+def test_summaries_include_archived_rows(db, test_user, archive_dir, transactions):
+    """Test monthly and range summaries read archived partitions"""
+    archive.archive_transactions(db, datetime(2024, 1, 1), test_user.id)
+
+    summary = crud.get_monthly_spending_summary(db, year=2023, month=2, user_id=test_user.id)
+    assert [(item.category, item.total_amount) for item in summary] == [(FOOD, -20.0)]
+
+    cube = analytics.load_cube(db, test_user.id)
+    buckets = cube.summarize(date(2023, 1, 1), date(2025, 12, 31), "year")
+    assert [float(totals.sum()) for _, totals in buckets] == [-30.0, 0.0, -30.0]
+
+
+def test_search_pages_from_hot_rows_into_archive(db, test_user, archive_dir, transactions):
+    """Test search returns hot matches first and then archived ones"""
+    archive.archive_transactions(db, datetime(2024, 1, 1), test_user.id)
+
+    first, cursor = search.search_transactions(db, "uber trip", user_id=test_user.id, limit=2)
+    assert [t.description for t in first] == ["Uber Trip May", "Uber Trip January"]
+    second, cursor = search.search_transactions(db, "uber trip", user_id=test_user.id, limit=2, cursor=cursor)
+    assert [t.description for t in second] == ["Uber Trip February"]
+    assert cursor is None
+
+
+def test_archived_ids_are_not_reused(db, test_user, archive_dir):
+    """Test new rows never take the id of an archived row"""
+    db.add(models.Transaction(date=datetime(2023, 1, 10), description="Old", amount=-1.0, owner_id=test_user.id))
+    db.commit()
+    archive.archive_transactions(db, datetime(2024, 1, 1), test_user.id)
+
+    fresh = models.Transaction(date=datetime(2025, 5, 1), description="New", amount=-1.0, owner_id=test_user.id)
+    db.add(fresh)
+    db.commit()
+    assert fresh.id > archive.max_archived_id()
+
+
+def test_recover_pending_publishes_committed_parts(db, test_user, archive_dir, transactions):
+    """Test a part left pending after its delete committed is published on the next run"""
+    archive.archive_transactions(db, datetime(2024, 1, 1), test_user.id)
+    for path in archive.partition_files(test_user.id):
+        path.rename(path.with_name(path.name + archive.PENDING_SUFFIX))
+    assert archive.read_archived(test_user.id) is None
+
+    assert archive.recover_pending(db, test_user.id) == 2
+    assert archive.read_archived(test_user.id).num_rows == 2
+
+
+def test_recover_pending_discards_uncommitted_parts(db, test_user, archive_dir, transactions):
+    """Test a part whose rows are still hot is discarded instead of double-counting them"""
+    import pyarrow.parquet as pq
+
+    rows = db.query(models.Transaction).filter(models.Transaction.date < datetime(2024, 1, 1)).all()
+    month_dir = archive_dir / f"user={test_user.id}" / "month=2023-01"
+    month_dir.mkdir(parents=True)
+    pq.write_table(archive._to_table(rows), month_dir / f"part-crashed.parquet{archive.PENDING_SUFFIX}")
+
+    assert archive.recover_pending(db, test_user.id) == 0
+    assert list(month_dir.iterdir()) == []
+    assert archive.archive_transactions(db, datetime(2024, 1, 1), test_user.id) == 2
+    assert archive.read_archived(test_user.id).num_rows == 2
+
+
+
+def test_recover_pending_ignores_other_owners_rows(db, test_user, archive_dir, transactions):
+    """Test another user's hot row with the same id does not get a committed part discarded"""
+    archive.archive_transactions(db, datetime(2024, 1, 1), test_user.id)
+    archived_ids = archive.read_archived(test_user.id, columns=["id"])["id"].to_pylist()
+    for path in archive.partition_files(test_user.id):
+        path.rename(path.with_name(path.name + archive.PENDING_SUFFIX))
+    other = crud.create_user(db, schemas.UserCreate(username="other", password="pw"))
+    for transaction_id in archived_ids:  # e.g. rows a shard migration renumbered
+        db.add(models.Transaction(id=transaction_id, date=datetime(2023, 1, 1), description="Other", amount=-1.0, owner_id=other.id))
+    db.commit()
+
+    assert archive.recover_pending(db, test_user.id) == 2
+    assert archive.read_archived(test_user.id).num_rows == 2
@@ -0,0 +1,97 @@
+import pytest
+from app.cache import ResponseCache, etag_matches, make_cache_key, make_etag
+
+
+def test_response_cache_evicts_least_recently_used():
+    """Test the response cache stays within its byte bound"""
+    cache = ResponseCache(max_bytes=6)
+    a, b, c = (make_cache_key(user_id, "transactions", {}, 0) for user_id in (1, 2, 3))
+    cache.set(a, b"11")
+    cache.set(b, b"22")
+    assert cache.get(a) == b"11"  # a is now most recently used
+    cache.set(c, b"333")
+
+    assert cache.get(b) is None
+    assert cache.get(a) == b"11"
+    assert cache.get(c) == b"333"
+    assert cache.nbytes == 5
+
+    cache.set(b, b"too large")
+    assert cache.get(b) is None
+    assert len(cache) == 2
+
+
+def test_response_cache_drops_older_versions():
+    """Test a user's bodies are dropped once their data version moves on"""
+    cache = ResponseCache(max_bytes=1024)
+    old = make_cache_key(1, "transactions", {"limit": 100}, 3)
+    other = make_cache_key(2, "transactions", {"limit": 100}, 3)
+    cache.set(old, b"old")
+    cache.set(other, b"other")
+
+    assert cache.get(make_cache_key(1, "search", {"q": "uber"}, 4)) is None
+    assert cache.get(old) is None
+    assert cache.get(other) == b"other"
+    assert cache.nbytes == len(b"other")
+
+    cache.set(old, b"late")  # rendered by a request authenticated before the write
+    assert cache.get(old) is None
+
+
+@pytest.mark.parametrize(
+    "header,expected",
+    [
+        (None, False),
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"xyz", "abc"', True),
+        ("*", True),
+        ('"xyz"', False),
+    ]
+)
+def test_etag_matches(header, expected):
+    """Test If-None-Match parsing"""
+    assert etag_matches(header, '"abc"') is expected
+
+
+def test_etag_changes_with_data_version():
+    """Test a data version bump yields a new ETag"""
+    before = make_etag(make_cache_key(1, "transactions", {"skip": 0, "limit": 100}, 3))
+    after = make_etag(make_cache_key(1, "transactions", {"skip": 0, "limit": 100}, 4))
+    assert before != after
+
+
+def test_conditional_get_returns_304_until_write(client, db, test_user, test_token):
+    """Test unchanged reads are answered with 304 and writes invalidate them"""
+    headers = {"Authorization": f"Bearer {test_token}"}
+    response = client.get("/api/v1/transactions/summary/monthly/2025/5", headers=headers)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    response = client.get(
+        "/api/v1/transactions/summary/monthly/2025/5",
+        headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+
+    csv_content = b"Date,Description,Amount\n2025-05-03,Coffee,-4.5\n"
+    response = client.post(
+        "/api/v1/transactions/upload-csv/",
+        files={"file": ("statement.csv", csv_content, "text/csv")},
+        headers=headers
+    )
+    assert response.status_code == 200
+
+    response = client.get(
+        "/api/v1/transactions/summary/monthly/2025/5",
+        headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_list_page_size_is_bounded(client, test_token):
+    """Test oversized pages are rejected instead of rendered and cached"""
+    headers = {"Authorization": f"Bearer {test_token}"}
+    assert client.get("/api/v1/transactions/?limit=10000", headers=headers).status_code == 200
+    assert client.get("/api/v1/transactions/?limit=10001", headers=headers).status_code == 422
@@ -0,0 +1,78 @@
+from sqlalchemy import create_engine, inspect
+from app import archive
+from app.database import SCHEMA_VERSION, init_db
+
+
+def test_init_db_skips_up_to_date_schema(tmp_path):
+    """Test the schema is only created once per version"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'init.db'}")
+
+    assert init_db(engine) is True
+    assert init_db(engine) is False
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA user_version").scalar() == SCHEMA_VERSION
+    assert {"users", "transactions", "rules", "transactions_fts"} <= set(inspect(engine).get_table_names())
+
+
+def test_init_db_does_not_scan_archive_for_new_database(tmp_path, monkeypatch):
+    """Test new databases (e.g. each new shard) skip the upgrade steps"""
+    def scan():
+        raise AssertionError("new databases must not read the archive")
+
+    monkeypatch.setattr(archive, "max_archived_id", scan)
+    engine = create_engine(f"sqlite:///{tmp_path / 'shard.db'}")
+
+    assert init_db(engine) is True
+    with engine.begin() as connection:
+        sql = connection.exec_driver_sql("SELECT sql FROM sqlite_master WHERE name = 'transactions'").scalar()
+        assert "AUTOINCREMENT" in sql
+        assert "migrating" in {row[1] for row in connection.exec_driver_sql("PRAGMA table_info(user_shards)")}
+    assert "transactions_fts" in inspect(engine).get_table_names()
+
+
+def test_init_db_upgrades_legacy_database(tmp_path):
+    """Test databases from before versioning gain the new columns"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR NOT NULL, "
+            "hashed_password VARCHAR NOT NULL, created_at DATETIME)"
+        )
+        connection.exec_driver_sql("INSERT INTO users (username, hashed_password) VALUES ('old', 'x')")
+
+    assert init_db(engine) is True
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT data_version FROM users").scalar() == 0
+
+
+def test_init_db_rebuilds_transactions_with_autoincrement(tmp_path):
+    """Test legacy transaction tables stop reusing ids but keep rows and search"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE transactions (id INTEGER NOT NULL PRIMARY KEY, date DATETIME NOT NULL, "
+            "description VARCHAR, amount FLOAT NOT NULL, raw_text VARCHAR, category VARCHAR(13) NOT NULL, "
+            "created_at DATETIME, updated_at DATETIME, notes VARCHAR, owner_id INTEGER)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO transactions (id, date, description, amount, category) VALUES "
+            "(1, '2025-05-01', 'Uber Trip', -10.0, 'TRANSPORT'), (2, '2025-05-02', 'Coffee', -3.0, 'FOOD_DRINK')"
+        )
+
+    init_db(engine)
+    with engine.begin() as connection:
+        sql = connection.exec_driver_sql("SELECT sql FROM sqlite_master WHERE name = 'transactions'").scalar()
+        assert "AUTOINCREMENT" in sql
+        connection.exec_driver_sql("DELETE FROM transactions WHERE id = 2")
+        connection.exec_driver_sql(
+            "INSERT INTO transactions (date, description, amount, category) VALUES ('2025-05-03', 'Uber Eats', -8.0, 'FOOD_DRINK')"
+        )
+        assert connection.exec_driver_sql("SELECT max(id) FROM transactions").scalar() == 3
+        matches = connection.exec_driver_sql(
+            "SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH '\"uber\"' ORDER BY rowid"
+        ).scalars().all()
+        assert matches == [1, 3]
+    assert {"ix_transactions_id", "ix_transactions_description"} <= {
+        index["name"] for index in inspect(engine).get_indexes("transactions")
+    }
+
@@ -0,0 +1,43 @@
+from datetime import datetime, timezone
+
+
+def test_columnar_format_matches_rows(client, db, test_user, test_token):
+    """Test ?format=columnar carries the same data as the default list"""
+    headers = {"Authorization": f"Bearer {test_token}"}
+    csv_content = (
+        b"Date,Description,Amount,RawText\n"
+        b"2025-04-01,Starbucks Coffee,-5.75,POS 1234 Starbucks Coffee NYC\n"
+        b"2025-04-02,Uber Ride,-12.3,Uber trip ID 987654\n"
+        b"2025-04-03,Salary,2500,ACME PAYROLL\n"
+    )
+    response = client.post(
+        "/api/v1/transactions/upload-csv/",
+        files={"file": ("statement.csv", csv_content, "text/csv")},
+        headers=headers
+    )
+    assert response.status_code == 200
+
+    rows = client.get("/api/v1/transactions/", headers=headers).json()
+    response = client.get("/api/v1/transactions/", params={"format": "columnar"}, headers=headers)
+    assert response.status_code == 200
+    columns = response.json()
+
+    assert columns["id"] == [row["id"] for row in rows]
+    assert columns["description"] == [row["description"] for row in rows]
+    assert columns["amount"] == [row["amount"] for row in rows]
+    assert columns["raw_text"] == [row["raw_text"] for row in rows]
+    assert [columns["categories"][code] for code in columns["category"]] == [row["category"] for row in rows]
+    assert columns["date"] == [
+        int(datetime.fromisoformat(row["date"]).replace(tzinfo=timezone.utc).timestamp()) for row in rows
+    ]
+
+
+def test_columnar_format_empty(client, test_user, test_token):
+    """Test the columnar format with no transactions"""
+    response = client.get(
+        "/api/v1/transactions/",
+        params={"format": "columnar"},
+        headers={"Authorization": f"Bearer {test_token}"}
+    )
+    assert response.status_code == 200
+    assert response.json()["id"] == []
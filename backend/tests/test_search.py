@@ -0,0 +1,102 @@
+import pytest
+from datetime import datetime
+from app import crud, models, schemas, search
+
+
+@pytest.fixture
+def transactions(db, test_user):
+    rows = [
+        ("Uber Trip", "UBER *TRIP HELP.UBER.COM", -12.3),
+        ("UBEREATS order", None, -25.0),
+        ("Amazon Marketplace", "AMZN Mktp US", -40.0),
+        ("Starbucks Coffee", "POS 1234 Starbucks Coffee NYC", -5.75),
+    ]
+    created = []
+    for description, raw_text, amount in rows:
+        db_transaction = models.Transaction(
+            date=datetime(2025, 5, 1), description=description, raw_text=raw_text,
+            amount=amount, owner_id=test_user.id
+        )
+        db.add(db_transaction)
+        created.append(db_transaction)
+    db.commit()
+    return created
+
+
+@pytest.mark.parametrize(
+    "text,expected",
+    [
+        ("uber", '"uber"'),
+        ("uber trip", '"uber" "trip"'),
+        ('say "hi" now', '"say" """hi""" "now"'),
+    ]
+)
+def test_build_match_query(text, expected):
+    """Test free text is quoted into FTS5 substring terms"""
+    assert search.build_match_query(text) == expected
+
+
+@pytest.mark.parametrize(
+    "pattern,expected",
+    [
+        ("uber", '"uber"'),
+        ("uber|lyft", '"uber" OR "lyft"'),
+        (r"\bamazon\b", '"amazon"'),
+        ("star.*coffee", None),
+        ("ab|uber", None),
+    ]
+)
+def test_rule_match_query(pattern, expected):
+    """Test only literal rule patterns are translated to index lookups"""
+    assert search.rule_match_query(pattern) == expected
+
+
+def test_search_is_substring_and_case_insensitive(db, test_user, transactions):
+    """Test search finds substrings in description and raw text"""
+    items, next_cursor = search.search_transactions(db, "uber", user_id=test_user.id)
+    assert {t.description for t in items} == {"Uber Trip", "UBEREATS order"}
+    assert next_cursor is None
+
+    items, _ = search.search_transactions(db, "amzn", user_id=test_user.id)
+    assert [t.description for t in items] == ["Amazon Marketplace"]
+
+
+def test_search_keyset_paging(db, test_user, transactions):
+    """Test pages are disjoint and cover all results"""
+    first, cursor = search.search_transactions(db, "uber", user_id=test_user.id, limit=1)
+    assert cursor is not None
+    second, cursor = search.search_transactions(db, "uber", user_id=test_user.id, limit=1, cursor=cursor)
+    assert cursor is None
+    assert {first[0].id, second[0].id} == {transactions[0].id, transactions[1].id}
+
+
+def test_deleted_transactions_leave_the_index(db, test_user, transactions):
+    """Test the FTS triggers follow deletes"""
+    db.delete(transactions[3])
+    db.commit()
+    items, _ = search.search_transactions(db, "starbucks", user_id=test_user.id)
+    assert items == []
+
+
+def test_new_rule_categorizes_existing_transactions(db, test_user, transactions):
+    """Test adding a rule applies it to matching uncategorized transactions"""
+    rule = schemas.RuleCreate(name="Rides", pattern="uber trip", category=models.TransactionCategoryEnum.TRANSPORT)
+    crud.create_rule(db, rule, user_id=test_user.id)
+
+    db.refresh(transactions[0])
+    db.refresh(transactions[1])
+    assert transactions[0].category == models.TransactionCategoryEnum.TRANSPORT
+    assert transactions[1].category == models.TransactionCategoryEnum.UNCATEGORIZED
+
+
+def test_search_endpoint(client, test_user, test_token, transactions):
+    """Test the search endpoint filters by category"""
+    response = client.get(
+        "/api/v1/transactions/search",
+        params={"q": "coffee", "category": "Uncategorized"},
+        headers={"Authorization": f"Bearer {test_token}"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["description"] for item in data["items"]] == ["Starbucks Coffee"]
+    assert data["next_cursor"] is None
@@ -0,0 +1,221 @@
+import threading
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine, func, select
+from app import archive, database, models, sharding
+from app.core.config import settings
+
+
+@pytest.fixture
+def sharded(tmp_path, monkeypatch):
+    """Hash users over two shard files next to a scratch directory database"""
+    directory = create_engine(f"sqlite:///{tmp_path / 'directory.db'}", connect_args={"check_same_thread": False})
+    database.init_db(directory)
+    monkeypatch.setattr(database, "engine", directory)
+    monkeypatch.setattr(settings, "SHARD_MODE", "hashed")
+    monkeypatch.setattr(settings, "SHARD_COUNT", 2)
+    monkeypatch.setattr(settings, "SHARD_DIR", str(tmp_path / "shards"))
+    sharding.clear_caches()
+    yield directory
+    sharding.clear_caches()
+
+
+def make_user_with_transactions(directory, username, count=3):
+    with database.RoutingSession(bind=directory) as db:
+        user = models.User(username=username, hashed_password="x")
+        db.add(user)
+        db.commit()
+        database.bind_owner(db, user.id)
+        for i in range(count):
+            db.add(models.Transaction(date=datetime(2025, 5, i + 1), description=f"Row {i}", amount=-1.0, owner_id=user.id))
+        db.commit()
+        return user.id
+
+
+def count_rows(engine, user_id):
+    with engine.connect() as connection:
+        return connection.execute(
+            select(func.count()).select_from(models.Transaction.__table__).where(models.Transaction.owner_id == user_id)
+        ).scalar()
+
+
+def test_default_shard(monkeypatch):
+    """Test per-user and hashed placement"""
+    monkeypatch.setattr(settings, "SHARD_MODE", "per_user")
+    assert sharding.default_shard(42) == "user_42"
+    monkeypatch.setattr(settings, "SHARD_MODE", "hashed")
+    monkeypatch.setattr(settings, "SHARD_COUNT", 4)
+    assert sharding.default_shard(42) == sharding.default_shard(42)
+    assert sharding.default_shard(42) in {f"shard_{i}" for i in range(4)}
+
+
+def test_transactions_are_written_to_the_owners_shard(sharded):
+    """Test sharded tables bypass the directory database"""
+    user_id = make_user_with_transactions(sharded, "alice")
+
+    shard = sharding.shard_for_user(user_id)
+    assert shard == sharding.default_shard(user_id)
+    assert count_rows(sharding.engine_for_shard(shard), user_id) == 3
+    assert count_rows(sharded, user_id) == 0
+
+
+def test_unbound_session_cannot_query_sharded_tables(sharded):
+    """Test a session without an owner refuses to guess a shard"""
+    with database.RoutingSession(bind=sharded) as db:
+        with pytest.raises(RuntimeError):
+            db.query(models.Transaction).all()
+
+
+def test_migrate_user_moves_rows_and_updates_map(sharded):
+    """Test migrating a user between shards"""
+    user_id = make_user_with_transactions(sharded, "bob")
+    source = sharding.shard_for_user(user_id)
+    target = "shard_1" if source == "shard_0" else "shard_0"
+
+    assert sharding.migrate_user(user_id, target) == 3
+    assert sharding.shard_for_user(user_id) == target
+    assert count_rows(sharding.engine_for_shard(target), user_id) == 3
+    assert count_rows(sharding.engine_for_shard(source), user_id) == 0
+    with sharded.connect() as connection:
+        assert connection.execute(select(models.User.data_version).where(models.User.id == user_id)).scalar() == 1
+
+
+def other_shard(shard):
+    return "shard_1" if shard == "shard_0" else "shard_0"
+
+
+def test_first_lookups_race_to_one_assignment(sharded):
+    """Test concurrent first requests for a new user agree on one shard"""
+    with database.RoutingSession(bind=sharded) as db:
+        user = models.User(username="carol", hashed_password="x")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+    barrier = threading.Barrier(8)
+    results, errors = [], []
+
+    def lookup():
+        barrier.wait()
+        try:
+            results.append(sharding.shard_for_user(user_id))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=lookup) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert set(results) == {sharding.default_shard(user_id)}
+
+
+def test_stale_session_cannot_commit_after_migration(sharded):
+    """Test a session that resolved the old shard fails instead of losing its write"""
+    user_id = make_user_with_transactions(sharded, "dave")
+    source = sharding.shard_for_user(user_id)
+    target = other_shard(source)
+
+    with database.RoutingSession(bind=sharded) as db:
+        database.bind_owner(db, user_id)
+        assert db.query(models.Transaction).count() == 3  # resolves the source shard
+        sharding.migrate_user(user_id, target)
+        db.add(models.Transaction(date=datetime(2025, 6, 1), description="Late", amount=-1.0, owner_id=user_id))
+        with pytest.raises(sharding.ShardMigrating):
+            db.commit()
+
+    assert count_rows(sharding.engine_for_shard(source), user_id) == 0
+    assert count_rows(sharding.engine_for_shard(target), user_id) == 3
+
+
+def test_sessions_are_refused_while_migrating(sharded):
+    """Test new sessions get ShardMigrating while the flag is set"""
+    user_id = make_user_with_transactions(sharded, "erin")
+    sharding._set_assignment(user_id, migrating=True)
+
+    with database.RoutingSession(bind=sharded) as db:
+        database.bind_owner(db, user_id)
+        with pytest.raises(sharding.ShardMigrating):
+            db.query(models.Transaction).all()
+
+
+def test_migrate_rerun_replaces_partial_copy(sharded):
+    """Test rerunning an interrupted migration does not duplicate rows on the target"""
+    user_id = make_user_with_transactions(sharded, "frank")
+    target = other_shard(sharding.shard_for_user(user_id))
+    with sharding.engine_for_shard(target).begin() as connection:
+        connection.execute(models.Transaction.__table__.insert(), [
+            {"date": datetime(2025, 5, 1), "description": "Partial copy", "amount": -1.0,
+             "category": models.TransactionCategoryEnum.UNCATEGORIZED, "owner_id": user_id}
+        ])
+
+    assert sharding.migrate_user(user_id, target) == 3
+    assert count_rows(sharding.engine_for_shard(target), user_id) == 3
+
+
+def test_archive_all_skips_users_without_shards(sharded):
+    """Test archiving visits only users with a shard assignment"""
+    pytest.importorskip("pyarrow")
+    with database.RoutingSession(bind=sharded) as db:
+        db.add(models.User(username="idle", hashed_password="x"))
+        db.commit()
+    user_id = make_user_with_transactions(sharded, "grace")
+
+    with database.RoutingSession(bind=sharded) as db:
+        moved = archive.archive_all(db, horizon_days=0)
+        assert moved == {user_id: 3}
+        assert [u for (u,) in db.query(models.UserShard.user_id)] == [user_id]
+
+
+
+def test_migrated_rows_do_not_reuse_archived_ids(sharded):
+    """Test rows renumbered by a migration stay clear of the user's archived ids"""
+    pytest.importorskip("pyarrow")
+    user_id = make_user_with_transactions(sharded, "heidi", count=6)
+    source = sharding.shard_for_user(user_id)
+    with database.RoutingSession(bind=sharded) as db:
+        database.bind_owner(db, user_id)
+        assert archive.archive_transactions(db, datetime(2025, 5, 4), user_id) == 3
+
+    sharding.migrate_user(user_id, other_shard(source))
+    with database.RoutingSession(bind=sharded) as db:
+        database.bind_owner(db, user_id)
+        hot_ids = [transaction_id for (transaction_id,) in db.query(models.Transaction.id)]
+    assert len(hot_ids) == 3
+    assert min(hot_ids) > archive.max_archived_id(user_id)
+
+
+def test_rebalance_moves_rows_from_before_sharding(sharded):
+    """Test rows written before sharding was enabled stay visible until rebalance moves them"""
+    with database.RoutingSession(bind=sharded) as db:
+        users = [models.User(username=name, hashed_password="x") for name in ("ivan", "judy")]
+        db.add_all(users)
+        db.commit()
+        active, idle = [user.id for user in users]
+    with sharded.begin() as connection:  # written while SHARD_MODE was still "none"
+        for user_id in (active, idle):
+            connection.execute(models.Transaction.__table__.insert(), [
+                {"date": datetime(2025, 5, i + 1), "description": f"Old {i}", "amount": -1.0,
+                 "category": models.TransactionCategoryEnum.UNCATEGORIZED, "owner_id": user_id}
+                for i in range(2)
+            ])
+            connection.execute(models.Rule.__table__.insert(), [
+                {"name": "Uber", "pattern": "uber", "category": models.TransactionCategoryEnum.TRANSPORT, "owner_id": user_id}
+            ])
+
+    with database.RoutingSession(bind=sharded) as db:
+        database.bind_owner(db, active)
+        assert db.query(models.Transaction).filter(models.Transaction.owner_id == active).count() == 2
+    assert sharding.shard_for_user(active) == sharding.MAIN_SHARD
+
+    moves = sharding.rebalance()
+    assert moves == {active: sharding.default_shard(active), idle: sharding.default_shard(idle)}
+    for user_id in (active, idle):
+        shard = sharding.shard_for_user(user_id)
+        assert shard == sharding.default_shard(user_id)
+        assert count_rows(sharding.engine_for_shard(shard), user_id) == 2
+        assert count_rows(sharded, user_id) == 0
+        with database.RoutingSession(bind=sharded) as db:
+            database.bind_owner(db, user_id)
+            assert db.query(models.Rule).filter(models.Rule.owner_id == user_id).count() == 1
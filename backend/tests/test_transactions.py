@@ -74,7 +74,7 @@ def test_transaction_rules_crud(client, db, test_user, test_token):
     response = client.post(
         "/api/v1/transactions/rules/",
         json=rule_data,
-        headers={"Authorization": f"Bearer {test_token}"
+        headers={"Authorization": f"Bearer {test_token}"}
     )
     assert response.status_code == 200
     created_rule = response.json()
@@ -82,7 +82,7 @@ def test_transaction_rules_crud(client, db, test_user, test_token):
     # Get the rule
     response = client.get(
         f"/api/v1/transactions/rules/{created_rule['id']}/",
-        headers={"Authorization": f"Bearer {test_token}"
+        headers={"Authorization": f"Bearer {test_token}"}
     )
     assert response.status_code == 200
     retrieved_rule = response.json()
@@ -96,7 +96,7 @@ def test_transaction_rules_crud(client, db, test_user, test_token):
     response = client.put(
         f"/api/v1/transactions/rules/{created_rule['id']}/",
         json=update_data,
-        headers={"Authorization": f"Bearer {test_token}"
+        headers={"Authorization": f"Bearer {test_token}"}
     )
     assert response.status_code == 200
     updated_rule = response.json()
@@ -106,7 +106,7 @@ def test_transaction_rules_crud(client, db, test_user, test_token):
     # Delete the rule
     response = client.delete(
         f"/api/v1/transactions/rules/{created_rule['id']}/",
-        headers={"Authorization": f"Bearer {test_token}"
+        headers={"Authorization": f"Bearer {test_token}"}
     )
     assert response.status_code == 200
 
@@ -133,14 +133,14 @@ def test_monthly_summary(client, db, test_user, test_token):
         response = client.post(
             "/api/v1/transactions/",
             json=transaction,
-            headers={"Authorization": f"Bearer {test_token}"
+            headers={"Authorization": f"Bearer {test_token}"}
         )
         assert response.status_code == 200
     
     # Get monthly summary
     response = client.get(
         "/api/v1/transactions/summary/2025/5",
-        headers={"Authorization": f"Bearer {test_token}"
+        headers={"Authorization": f"Bearer {test_token}"}
     )
     assert response.status_code == 200
     summary = response.json()